@@ -1,19 +1,34 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import os
 import pandas as pd
 import requests
-import isodate
-import tempfile
+import io
+import hashlib
+import json
 import re
-from textblob import TextBlob
+import threading
 import numpy as np
-import subprocess
-import sys
-import shutil
 from dotenv import load_dotenv
-import emoji
 load_dotenv()
+import dataset_store
+import hashtag_index
+import percentile_index
+import snapshot_store
+from title_features import FEATURE_COLUMNS, compute_title_features
+from title_similarity import assign_title_clusters
+from http_cache import cached_by_dataset, send_static_cached
+import refresh_scheduler
+import request_profiler
+import result_cache
+from subscriber_csv import load_subscriber_csv
+from request_profiler import profiled
+import generate_attributions
+import generate_sub_peaks
+from generate_attributions import compute_attributions
+from generate_shorts_by_day import compute_shorts_by_day
+from generate_sub_peaks import find_sub_peaks
+from quantile_sketch import DEFAULT_K, SKETCH_METRICS, KLLSketch, build_daily_sketches, exact_quantile, merge_daily_sketches
 
 app = Flask(__name__)
 # Allow CORS from GitHub Pages and localhost
@@ -27,6 +42,12 @@ CORS(app, origins=[
 ])
 
 API_KEY = os.getenv('API_KEY')
+# Overridden by the load-test harness to point at a local fake API
+YOUTUBE_API_BASE = os.getenv('YOUTUBE_API_BASE', 'https://www.googleapis.com/youtube/v3')
+# Playlist pages (50 uploads each) fetched before a mode=preview analysis responds
+PREVIEW_PAGES = int(os.getenv('PREVIEW_PAGES', '4'))
+# Channel IDs also name files in the dataset and snapshot stores, so nothing else may pass
+CHANNEL_ID_PATTERN = re.compile(r'UC[\w-]{22}', re.ASCII)
 
 # ===== API MODE ONLY =====
 # Using YouTube API for data
@@ -49,53 +70,73 @@ def test_route():
 
 @app.route('/dashboard')
 def serve_dashboard():
-    print("DEBUG: Serving dashboard index.html")
-    return send_from_directory('static/dashboard', 'index.html')
+    return send_static_cached('static/dashboard', 'index.html')
 
 @app.route('/dashboard/<path:path>')
 def serve_dashboard_static(path):
-    print(f"DEBUG: Serving dashboard asset: {path}")
-    return send_from_directory('static/dashboard', path)
+    return send_static_cached('static/dashboard', path)
 
 @app.route('/<path:path>')
 def serve_static(path):
     return send_from_directory('static', path)
 
 # --- Helper functions (from api_pulled.py) ---
-def get_all_videos_from_playlist(playlist_id):
-    """Get all videos from a playlist (uploads playlist), with debug prints."""
-    videos = []
-    url = 'https://www.googleapis.com/youtube/v3/playlistItems'
+ISO8601_DURATION = (r'^P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+                    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:\.\d+)?)S)?)?$')
+
+def parse_iso8601_durations(durations):
+    """Vectorized ISO-8601 duration parsing (e.g. PT1M2S, P1DT2H, P0D) to seconds.
+
+    Values that are not a duration come back as NaN.
+    """
+    parts = durations.str.extract(ISO8601_DURATION).astype(float).fillna(0)
+    seconds = (parts['weeks'] * 604800 + parts['days'] * 86400 + parts['hours'] * 3600
+               + parts['minutes'] * 60 + parts['seconds'])
+    return seconds.where(durations.str.match(ISO8601_DURATION).fillna(False).astype(bool))
+
+def fetch_playlist_pages(playlist_id, max_pages=None, page_token=None):
+    """Fetch playlist pages (newest uploads first) from page_token onwards, at most max_pages of them.
+
+    Returns a DataFrame of video_id, title and published_at, and the token of
+    the next page (None once the playlist is exhausted).
+    """
+    columns = {'video_id': [], 'title': [], 'published_at': []}
+    url = f'{YOUTUBE_API_BASE}/playlistItems'
     params = {
         'part': 'snippet,contentDetails',
         'playlistId': playlist_id,
         'maxResults': 50,
         'key': API_KEY
     }
+    if page_token:
+        params['pageToken'] = page_token
     page = 1
     while True:
         resp = requests.get(url, params=params)
-        try:
-            resp.raise_for_status()
-        except Exception:
-            raise
+        resp.raise_for_status()
         data = resp.json()
         for item in data.get('items', []):
-            videos.append({
-                'video_id': item['contentDetails']['videoId'],
-                'title': item['snippet']['title'],
-                'published_at': item['snippet']['publishedAt']
-            })
-        if 'nextPageToken' in data:
-            params['pageToken'] = data['nextPageToken']
-            page += 1
-        else:
+            columns['video_id'].append(item['contentDetails']['videoId'])
+            columns['title'].append(item['snippet']['title'])
+            columns['published_at'].append(item['snippet']['publishedAt'])
+        next_page_token = data.get('nextPageToken')
+        if not next_page_token or (max_pages is not None and page >= max_pages):
             break
+        params['pageToken'] = next_page_token
+        page += 1
+    videos = pd.DataFrame(columns)
+    videos['published_at'] = pd.to_datetime(videos['published_at'], utc=True)
+    return videos, next_page_token
+
+def get_all_videos_from_playlist(playlist_id):
+    """Get all videos from a playlist (uploads playlist) as a DataFrame of video_id, title and published_at."""
+    videos, _ = fetch_playlist_pages(playlist_id)
     return videos
 
 def get_video_details(video_ids):
-    details = []
-    url = 'https://www.googleapis.com/youtube/v3/videos'
+    """Fetch duration and statistics for video IDs in batches of 50, as a typed DataFrame."""
+    columns = {'video_id': [], 'duration': [], 'view_count': [], 'like_count': [], 'comment_count': []}
+    url = f'{YOUTUBE_API_BASE}/videos'
     for i in range(0, len(video_ids), 50):
         batch = video_ids[i:i+50]
         params = {
@@ -103,46 +144,65 @@ def get_video_details(video_ids):
             'part': 'contentDetails,statistics',
             'key': API_KEY
         }
-        resp = requests.get(url, params=params).json()
-        for item in resp.get('items', []):
-            vid = item['id']
-            dur = item['contentDetails']['duration']
+        resp = requests.get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        if 'error' in data:
+            # Quota and key errors must not look like videos that no longer exist
+            raise requests.HTTPError(f"YouTube API error: {data['error'].get('message', data['error'])}")
+        for item in data.get('items', []):
             stats = item.get('statistics', {})
-            details.append({
-                'video_id': vid,
-                'duration': dur,
-                'view_count': int(stats.get('viewCount', 0)),
-                'like_count': int(stats.get('likeCount', 0)),
-                'comment_count': int(stats.get('commentCount', 0))
-            })
-    return details
+            columns['video_id'].append(item['id'])
+            columns['duration'].append(item['contentDetails']['duration'])
+            columns['view_count'].append(int(stats.get('viewCount', 0)))
+            columns['like_count'].append(int(stats.get('likeCount', 0)))
+            columns['comment_count'].append(int(stats.get('commentCount', 0)))
+    return pd.DataFrame(columns).astype({'view_count': 'int64', 'like_count': 'int64', 'comment_count': 'int64'})
 
 def filter_shorts(videos, details, max_seconds=60):
-    details_map = {d['video_id']: d for d in details}
-    shorts = []
-    for v in videos:
-        vid = v['video_id']
-        if vid not in details_map:
-            continue
-        d = details_map[vid]
-        seconds = isodate.parse_duration(d['duration']).total_seconds()
-        if seconds <= max_seconds:
-            shorts.append({
-                'video_id': vid,
-                'title': v['title'],
-                'published_at': v['published_at'],
-                'duration_seconds': seconds,
-                'view_count': d['view_count'],
-                'like_count': d['like_count'],
-                'comment_count': d['comment_count']
-            })
-    return shorts
+    """Join playlist videos with their details and keep those no longer than max_seconds."""
+    shorts = videos.merge(details.drop_duplicates('video_id', keep='last'), on='video_id', how='inner')
+    shorts['duration_seconds'] = parse_iso8601_durations(shorts['duration'])
+    shorts = shorts[shorts['duration_seconds'] <= max_seconds]
+    return shorts[
+        ['video_id', 'title', 'published_at', 'duration_seconds', 'view_count', 'like_count', 'comment_count']
+    ].reset_index(drop=True)
+
+# Everything besides the CSV and the dataset that the cached subscriber analysis depends on;
+# bump 'version' when the peak, attribution or by-day logic changes
+SUBSCRIBER_ANALYSIS_PARAMS = {
+    'version': 1,
+    'lookback_days': generate_attributions.LOOKBACK_DAYS,
+    'top_k': generate_attributions.top_k,
+    'threshold_stds': generate_sub_peaks.THRESHOLD_STDS,
+    'peak_distance': generate_sub_peaks.PEAK_DISTANCE,
+}
 
 # --- Analytics processing (from cleaning_data.ipynb) ---
-def process_analytics_data(shorts_path):
-    w_comment_norm = 0.7842535737762139 # see Mikayla_Stats_Pull in google colab
-    w_like_norm = 0.21574642622378612 # see Mikayla_Stats_Pull in google colab
-    total_stats = pd.read_csv(shorts_path)
+# Columns persisted for the dashboard endpoints and the downstream attribution steps
+PROCESSED_COLUMNS = [
+    'video_id', 'title', 'published_at', 'date', 'time', 'hour',
+    'duration_seconds', 'view_count', 'like_count', 'comment_count', 'engagement_rate',
+    'has_hashtags', 'hashtag_count', 'has_emojis', 'emoji_count',
+    'clean_title', 'num_words',
+    'sentiment_polarity', 'sentiment', 'day_of_week', 'title_cluster'
+]
+
+W_COMMENT_NORM = 0.7842535737762139 # see Mikayla_Stats_Pull in google colab
+W_LIKE_NORM = 0.21574642622378612 # see Mikayla_Stats_Pull in google colab
+
+def engagement_rate(df):
+    """Weighted comments and likes per view, treating 0 views as 1."""
+    return (df['comment_count'] * W_COMMENT_NORM + df['like_count'] * W_LIKE_NORM) / df['view_count'].replace(0, 1)
+
+def process_analytics_data(total_stats, channel_id=None):
+    """Add engagement, title and time features to the shorts DataFrame from filter_shorts.
+
+    channel_id, when given, lets title clustering reuse the channel's stored
+    MinHash signatures. Returns the JSON-ready analytics payload and the
+    processed shorts DataFrame.
+    """
+    total_stats = total_stats.copy()
     
     # Clean NaN values in numeric columns before calculations
     total_stats['view_count'] = total_stats['view_count'].fillna(0)
@@ -151,7 +211,7 @@ def process_analytics_data(shorts_path):
     total_stats['duration_seconds'] = total_stats['duration_seconds'].fillna(0)
     
     # Calculate engagement rate with safe division
-    total_stats['engagement_rate'] = (total_stats['comment_count'] * w_comment_norm + total_stats['like_count'] * w_like_norm) / total_stats['view_count'].replace(0, 1)
+    total_stats['engagement_rate'] = engagement_rate(total_stats)
     total_stats['num_words'] = total_stats['title'].str.split().str.len()
     total_stats['published_at'] = pd.to_datetime(total_stats['published_at'], utc=True)
     total_stats['date'] = total_stats['published_at'].dt.date
@@ -167,54 +227,25 @@ def process_analytics_data(shorts_path):
     # Handle NaN titles by filling with empty string
     shorts['title'] = shorts['title'].fillna('')
     
-    shorts['has_hashtags'] = shorts['title'].str.contains('#', na=False)
-    shorts['hashtag_count'] = shorts['title'].str.count('#')
-
-    shorts['has_emojis'] = shorts['title'].apply(lambda x: emoji.emoji_count(str(x)) > 0)
-    shorts['emoji_count'] = shorts['title'].apply(lambda x: emoji.emoji_count(str(x)))
-    
-    def clean_title(title):
-        return re.sub(r'#\S+', '', title).strip()
-
-    shorts['clean_title'] = shorts['title'].apply(clean_title)
-    shorts['title_length'] = shorts['title'].str.len()
-    def compute_sentiment(text):
-        blob = TextBlob(text)
-        return blob.sentiment.polarity
-    shorts['sentiment_polarity'] = shorts['clean_title'].apply(compute_sentiment)
-    shorts['sentiment'] = shorts['sentiment_polarity'].apply(lambda x: 'positive' if x > 0 else 'negative' if x < 0 else 'neutral')
-    
+    # Per-title Python work (emoji, sentiment); runs on a process pool when ANALYTICS_WORKERS > 1
+    features = compute_title_features(shorts['title'])
+    for column in FEATURE_COLUMNS:
+        shorts[column] = features[column]
 
     shorts['day_of_week'] = pd.to_datetime(shorts['date']).dt.day_name()
     shorts = shorts.sort_values('published_at')
 
+    # Group near-duplicate titles (re-uploads, light retitles); labels are the earliest video's ID
+    shorts['title_cluster'] = assign_title_clusters(shorts, channel_id)
+
     # Group by day
-    by_day = shorts.groupby('date').agg(
-        video_ids=('video_id', lambda x: ', '.join(x)),
-        titles=('title', lambda x: ', '.join(x)),
-        avg_views=('view_count', 'mean'),
-        total_views=('view_count', 'sum'),
-        count_shorts=('title', 'count'),
-        avg_likes=('like_count', 'mean'),
-        total_likes=('like_count', 'sum'),
-        avg_comments=('comment_count', 'mean'),
-        total_comments=('comment_count', 'sum'),
-        avg_duration=('duration_seconds', 'mean'),
-        total_duration=('duration_seconds', 'sum'),
-    ).reset_index()
-
-    by_day['thumbnail_urls'] = by_day['video_ids'].apply(
-        lambda id_str: ','.join([
-            f'https://img.youtube.com/vi/{vid.strip()}/hqdefault.jpg'
-            for vid in id_str.split(',')
-        ])
-    )
-
-    shorts = shorts.replace([np.nan, np.inf, -np.inf], None)
+    by_day = compute_shorts_by_day(shorts)
+
+    shorts_clean = shorts.replace([np.nan, np.inf, -np.inf], None)
     by_day = by_day.replace([np.nan, np.inf, -np.inf], None)
 
     # Convert date and time objects to strings for JSON serialization
-    shorts_dict = shorts.to_dict('records')
+    shorts_dict = shorts_clean.to_dict('records')
     for record in shorts_dict:
         if 'time' in record and record['time'] is not None:
             record['time'] = str(record['time'])
@@ -237,9 +268,248 @@ def process_analytics_data(shorts_path):
             'total_views': int(shorts['view_count'].sum()),
             'avg_views_per_short': float(shorts['view_count'].mean()) if len(shorts) > 0 else 0
         }
+    }, shorts
+
+def crawl_coverage(videos, video_count, complete):
+    """Describe how much of a channel's uploads a dataset was built from."""
+    fetched = len(videos)
+    total = int(video_count) if video_count is not None else None
+    return {
+        'complete': complete,
+        'videos_fetched': fetched,
+        'channel_video_count': total,
+        'fraction': 1.0 if complete else (min(1.0, fetched / total) if total else None),
+        'oldest_published': str(videos['published_at'].min()) if fetched else None,
+    }
+
+def build_channel_dataset(channel_id, videos, details, coverage, make_current=True, expected_generation=None):
+    """Process fetched videos and details and store them as the channel's dataset.
+
+    Returns the JSON-ready analytics payload, the stored DataFrame and the new
+    dataset version, or None if expected_generation is given and the stored
+    dataset is no longer at it.
+    """
+    shorts = filter_shorts(videos, details)
+    processed, processed_shorts = process_analytics_data(shorts, channel_id)
+    
+    # Persist processed shorts once for the dashboard endpoints, with dates and
+    # times as text like the CSV they used to read
+    processed_df = processed_shorts[PROCESSED_COLUMNS].assign(
+        published_at=processed_shorts['published_at'].astype(str),
+        date=processed_shorts['date'].astype(str),
+        time=processed_shorts['time'].astype(str),
+        hour=processed_shorts['hour'].astype('int64'),
+    ).reset_index(drop=True)
+    sidecars = dict(dataset_store.dataset_sidecars(processed_df), coverage=coverage)
+    version = dataset_store.write_dataset(channel_id, processed_df, sidecars=sidecars, make_current=make_current,
+                                          expected_generation=expected_generation)
+    if version is None:
+        return None
+    percentile_index.update_channel(channel_id, processed_df)
+    refresh_scheduler.reset_channel(channel_id)
+    return processed, processed_df, version
+
+REFRESHED_COLUMNS = ['view_count', 'like_count', 'comment_count']
+
+def apply_refreshed_stats(channel_id, details):
+    """Merge re-fetched statistics into a stored dataset as a new generation.
+
+    Only engagement_rate and the quantile sketches of the affected days are
+    recomputed; the hashtag index and coverage sidecars are carried over.
+    No generation is written if none of the counts changed. Returns the
+    replaced rows (video_id, date and the old counts), or None if the dataset
+    is gone or was rewritten while the statistics were fetched.
+    """
+    version = dataset_store.read_version(channel_id)
+    df = dataset_store.load_frame(channel_id)
+    if version is None or df is None:
+        return None
+    snapshot_store.record_snapshots(channel_id, details)
+    stats = details.drop_duplicates('video_id', keep='last').set_index('video_id')[REFRESHED_COLUMNS]
+    updated = df.copy()
+    rows = updated['video_id'].astype(str).isin(stats.index).to_numpy()
+    previous = updated.loc[rows, ['video_id', 'date'] + REFRESHED_COLUMNS].copy()
+    refreshed = stats.loc[updated.loc[rows, 'video_id'].astype(str)]
+    if (previous[REFRESHED_COLUMNS].to_numpy() == refreshed[REFRESHED_COLUMNS].to_numpy()).all():
+        # Nothing moved: keep the generation, so dashboard caches stay valid
+        return previous
+    for column in REFRESHED_COLUMNS:
+        updated.loc[rows, column] = refreshed[column].to_numpy()
+    updated.loc[rows, 'engagement_rate'] = engagement_rate(updated.loc[rows])
+    
+    sidecars = {name: dataset_store.read_sidecar(name, channel_id) for name in ('index', 'coverage')}
+    sketches = dataset_store.read_sidecar('sketches', channel_id)
+    if sketches is None:
+        sketches = build_daily_sketches(updated)
+    else:
+        days = set(previous['date'].astype(str))
+        rebuilt = build_daily_sketches(updated[updated['date'].astype(str).isin(days)], sketches['k'])
+        sketches = {'k': sketches['k'], 'days': dict(sketches['days'], **rebuilt['days'])}
+    sidecars['sketches'] = sketches
+    
+    written = dataset_store.write_dataset(
+        channel_id, updated, sidecars={name: payload for name, payload in sidecars.items() if payload is not None},
+        make_current=False, expected_generation=version['generation'])
+    if written is None:
+        print(f"DEBUG: Dataset {channel_id} changed during the refresh; dropping it")
+        return None
+    percentile_index.update_channel(channel_id, updated)
+    return previous
+
+# channel_id -> the crawl job finishing that channel's latest preview in this process
+_background_crawls = {}
+_background_lock = threading.Lock()
+
+def start_background_crawl(channel_id, playlist_id, page_token, videos, details, video_count, generation):
+    """Finish a preview's playlist crawl in a background thread.
+
+    If a crawl for the channel is already running from the same page, it is
+    handed this preview and its generation instead ('updated'); a crawl from a
+    different page is replaced by a new one ('restarted'). Otherwise returns
+    'started'.
+    """
+    with _background_lock:
+        running = _background_crawls.get(channel_id)
+        if running is not None and running['page_token'] == page_token:
+            running.update(videos=videos, details=details, video_count=video_count, generation=generation)
+            return 'updated'
+        job = {'page_token': page_token, 'videos': videos, 'details': details,
+               'video_count': video_count, 'generation': generation}
+        _background_crawls[channel_id] = job
+    threading.Thread(
+        target=complete_crawl,
+        args=(channel_id, playlist_id, job),
+        name=f'crawl-{channel_id}',
+        daemon=True,
+    ).start()
+    return 'restarted' if running is not None else 'started'
+
+def complete_crawl(channel_id, playlist_id, job):
+    """Fetch the rest of a channel's uploads and replace its preview dataset with the full one.
+
+    The dataset is written only if it is still at the generation of the job's
+    latest preview. If a newer preview handed the job its generation while
+    this crawl was fetching, the crawl is rebuilt from that preview; any other
+    rewrite (e.g. a full analysis) drops the crawl, so it never overwrites
+    newer data.
+    """
+    try:
+        rest, _ = fetch_playlist_pages(playlist_id, page_token=job['page_token'])
+        rest_details = get_video_details(rest['video_id'].tolist())
+        snapshot_store.record_snapshots(channel_id, rest_details)
+        while True:
+            with _background_lock:
+                if _background_crawls.get(channel_id) is not job:
+                    print(f"DEBUG: Background crawl of {channel_id} was replaced; dropping it")
+                    return
+                preview = dict(job)
+            # Uploads published since the preview shift page boundaries, so the pages can overlap
+            all_videos = pd.concat([preview['videos'], rest], ignore_index=True).drop_duplicates('video_id')
+            all_details = pd.concat([preview['details'], rest_details], ignore_index=True).drop_duplicates('video_id')
+            built = build_channel_dataset(
+                channel_id, all_videos, all_details,
+                crawl_coverage(all_videos, preview['video_count'], complete=True),
+                make_current=dataset_store.current_channel() == channel_id,
+                expected_generation=preview['generation'],
+            )
+            if built is not None:
+                print(f"DEBUG: Background crawl of {channel_id} complete: {len(all_videos)} videos")
+                return
+            with _background_lock:
+                if job['generation'] == preview['generation']:
+                    # Not a preview of this job: checked and removed under one lock, so
+                    # no preview can hand its generation to a crawl that is giving up
+                    _background_crawls.pop(channel_id, None)
+                    print(f"DEBUG: Dataset {channel_id} changed since the preview; dropping the background crawl")
+                    return
+    except Exception as e:
+        import traceback
+        print(f"DEBUG: Background crawl of {channel_id} failed: {str(e)}")
+        print(f"DEBUG: Traceback: {traceback.format_exc()}")
+    finally:
+        with _background_lock:
+            if _background_crawls.get(channel_id) is job:
+                del _background_crawls[channel_id]
+
+def frame_to_records(df):
+    """Convert a result DataFrame to JSON records.
+
+    Datetime columns are formatted the way the CSV hand-off between the analysis
+    scripts used to render them (date only when every value is midnight).
+    """
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            values = df[column]
+            date_only = (values.dropna() == values.dropna().dt.normalize()).all()
+            df[column] = values.dt.strftime('%Y-%m-%d' if date_only else '%Y-%m-%d %H:%M:%S')
+    return df.replace([np.nan, np.inf, -np.inf], None).to_dict('records')
+
+ANALYSIS_SECTIONS = ('summary', 'shorts_data', 'daily_data', 'sub_peaks', 'attributions', 'sub_stats',
+                     'csv_validation', 'coverage')
+# The large per-video and raw-upload sections are left for the frontend to fetch when needed
+LEAN_DEFAULT_SECTIONS = ('summary', 'daily_data', 'sub_peaks', 'attributions', 'csv_validation', 'coverage')
+# Parts of the full response that a lean response does not repeat: shorts_by_day is the
+# same per-day aggregation as daily_data, and clean_title is title without its hashtags
+LEAN_ALIASES = {'shorts_by_day': 'daily_data'}
+LEAN_OMITTED_FIELDS = {'shorts_data': ['clean_title']}
+
+def parse_sections(value):
+    """Parse a comma-separated sections parameter; None when absent. Raises ValueError on unknown names."""
+    if not value:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ANALYSIS_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}. Valid sections: {', '.join(ANALYSIS_SECTIONS)}")
+    return names
+
+def json_body(prefix, sections):
+    """Return a JSON response of a dict plus a 'data' object spliced from already-serialized sections."""
+    data = ','.join(f'{json.dumps(name)}:{text}' for name, text in sections.items())
+    return app.response_class(app.json.dumps(prefix, separators=(',', ':'))[:-1] + f',"data":{{{data}}}}}\n',
+                              mimetype=app.json.mimetype)
+
+def lean_response(sections, requested, message):
+    """Build a response=lean response and keep every section for /api/analysis/<analysis_id>.
+
+    Each section appears once. The body holds the requested sections (by
+    default LEAN_DEFAULT_SECTIONS) and the serialized size of every section.
+    The analysis_id is a hash of the sections' content. Every section is
+    serialized once; the body and the section cache reuse that text.
+    """
+    requested = LEAN_DEFAULT_SECTIONS if requested is None else requested
+    serialized = {name: app.json.dumps(payload, separators=(',', ':')) for name, payload in sections.items()}
+    analysis_id = hashlib.sha256(
+        ''.join(f'{name}={serialized[name]}' for name in sorted(serialized)).encode()).hexdigest()
+    for name, text in serialized.items():
+        result_cache.put_text(f'{analysis_id}.{name}', text,
+                              result_cache.SECTION_CACHE_DIR, result_cache.SECTION_CACHE_MAX_BYTES)
+    result_cache.put_text(analysis_id, json.dumps(list(serialized)),
+                          result_cache.SECTION_CACHE_DIR, result_cache.SECTION_CACHE_MAX_BYTES)
+    return json_body({
+        'success': True,
+        'response': 'lean',
+        'analysis_id': analysis_id,
+        'sections': {name: {'bytes': len(serialized[name]), 'included': name in requested} for name in sections},
+        'aliases': LEAN_ALIASES,
+        'omitted_fields': LEAN_OMITTED_FIELDS,
+        'message': message,
+    }, {name: text for name, text in serialized.items() if name in requested})
+
+def analysis_sections(processed, coverage):
+    """Return the lean sections of a channel analysis, without the fields a lean response omits."""
+    omitted = set(LEAN_OMITTED_FIELDS['shorts_data'])
+    return {
+        'summary': processed['summary'],
+        'shorts_data': [{key: value for key, value in record.items() if key not in omitted}
+                        for record in processed['shorts_data']],
+        'daily_data': processed['daily_data'],
+        'coverage': coverage,
     }
 
 @app.route('/api/analyze', methods=['POST'])
+@profiled
 def analyze_channel():
     try:
         channel_id = request.form.get('channelId')
@@ -251,132 +521,132 @@ def analyze_channel():
         
         if not channel_id:
             return jsonify({'error': 'Channel ID is required.'}), 400
-        if not re.match(r'^UC[\w-]{22}$', channel_id):
+        if not CHANNEL_ID_PATTERN.fullmatch(channel_id):
             return jsonify({'error': 'Invalid channel ID format.'}), 400
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Check if this is a dummy CSV file (channel-only analysis)
-            is_channel_only = not csv_file or csv_file.filename == 'dummy.csv'
+        # preview: analyze only the newest pages now and finish the crawl in the background
+        mode = request.form.get('mode', 'full')
+        if mode not in ('full', 'preview'):
+            return jsonify({'error': "mode must be 'full' or 'preview'."}), 400
+        try:
+            preview_pages = int(request.form.get('previewPages', PREVIEW_PAGES))
+        except ValueError:
+            return jsonify({'error': 'previewPages must be an integer.'}), 400
+        if preview_pages < 1:
+            return jsonify({'error': 'previewPages must be at least 1.'}), 400
+        
+        # lean: each section once, only the requested ones, with the sizes of the rest
+        response_format = request.form.get('response', 'full')
+        if response_format not in ('full', 'lean'):
+            return jsonify({'error': "response must be 'full' or 'lean'."}), 400
+        try:
+            requested_sections = parse_sections(request.form.get('sections'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if requested_sections is not None and response_format != 'lean':
+            return jsonify({'error': 'sections requires response=lean.'}), 400
+        
+        # Check if this is a dummy CSV file (channel-only analysis)
+        is_channel_only = not csv_file or csv_file.filename == 'dummy.csv'
+        
+        if not is_channel_only:
+            # Full analysis with CSV, kept in memory rather than saved to disk
+            if not csv_file:
+                return jsonify({'error': 'CSV file is required for full analysis.'}), 400
             
-            if not is_channel_only:
-                # Full analysis with CSV
-                if not csv_file:
-                    return jsonify({'error': 'CSV file is required for full analysis.'}), 400
-                
-                csv_path = os.path.join(tmpdir, 'stats.csv')
-                csv_file.save(csv_path)
-            url = "https://www.googleapis.com/youtube/v3/channels"
-            params = {
-                'part': 'contentDetails',
-                'id': channel_id,
-                'key': API_KEY
+            # Validate the upload before spending API quota on the channel crawl
+            csv_bytes = csv_file.read()
+            upload = load_subscriber_csv(io.BytesIO(csv_bytes))
+            if upload.series is None:
+                return jsonify({
+                    'error': 'The subscriber CSV could not be used: ' + upload.errors[-1]['message'],
+                    'csv_validation': upload.summary(),
+                }), 400
+        url = f"{YOUTUBE_API_BASE}/channels"
+        params = {
+            'part': 'contentDetails,statistics',
+            'id': channel_id,
+            'key': API_KEY
+        }
+        resp = requests.get(url, params=params)
+        resp.raise_for_status()
+        data = resp.json()
+        if not data.get('items'):
+            return jsonify({'error': 'Channel not found or invalid channel ID.'}), 404
+        uploads_playlist_id = data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        video_count = data['items'][0].get('statistics', {}).get('videoCount')
+        videos, next_page_token = fetch_playlist_pages(
+            uploads_playlist_id, max_pages=preview_pages if mode == 'preview' else None)
+        details = get_video_details(videos['video_id'].tolist())
+        snapshot_store.record_snapshots(channel_id, details)
+        
+        # Process analytics data and store the dataset
+        coverage = crawl_coverage(videos, video_count, complete=next_page_token is None)
+        processed, processed_df, version = build_channel_dataset(channel_id, videos, details, coverage)
+        if next_page_token:
+            coverage['background_crawl'] = start_background_crawl(
+                channel_id, uploads_playlist_id, next_page_token, videos, details, video_count, version['generation'])
+        
+        if is_channel_only:
+            # Channel-only analysis - return data
+            if response_format == 'lean':
+                return lean_response(analysis_sections(processed, coverage), requested_sections,
+                                     'Channel analysis completed successfully.')
+            response_data = {
+                'success': True,
+                'data': processed,
+                'message': 'Channel analysis completed successfully.'
             }
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            if not data.get('items'):
-                return jsonify({'error': 'Channel not found or invalid channel ID.'}), 404
-            uploads_playlist_id = data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-            videos = get_all_videos_from_playlist(uploads_playlist_id)
-            video_ids = [v['video_id'] for v in videos]
-            details = get_video_details(video_ids)
-            shorts = filter_shorts(videos, details)
-            shorts_path = os.path.join(tmpdir, 'shorts.csv')
-            pd.DataFrame(shorts).to_csv(shorts_path, index=False)
+            if mode == 'preview':
+                response_data['coverage'] = coverage
+            return jsonify(response_data)
+        else:
+            # Full analysis with CSV; the peak and attribution stages are cached by
+            # content, so resubmitting the same CSV for unchanged data skips them
+            cache_key = result_cache.cache_key(
+                hashlib.sha256(csv_bytes).hexdigest(), version['digest'], SUBSCRIBER_ANALYSIS_PARAMS)
+            results = result_cache.get(cache_key)
+            if results is None:
+                sub_peaks_df = find_sub_peaks(upload.series)
+                attributions_df = compute_attributions(sub_peaks_df, processed_df)
+                results = {
+                    'sub_peaks': frame_to_records(sub_peaks_df),
+                    'attributions': frame_to_records(attributions_df),
+                    'shorts_by_day': frame_to_records(compute_shorts_by_day(processed_df)),
+                }
+                result_cache.put(cache_key, results)
+            else:
+                print(f"DEBUG: Reusing cached subscriber analysis {cache_key[:12]}")
             
-            # Process analytics data
-            processed = process_analytics_data(shorts_path)
+            # Check if attributions contain an error message
+            attributions = results['attributions']
+            if attributions and 'error' in attributions[0] and 'message' in attributions[0]:
+                if attributions[0]['error'] == 'no_overlap':
+                    return jsonify({'error': 'No date overlap between subscriber peaks and shorts data. Please ensure the uploaded CSV file matches the channel ID.'}), 400
+                elif attributions[0]['error'] == 'no_attributions':
+                    return jsonify({'error': 'No attributions found. The subscriber peaks may not align with the shorts data.'}), 400
             
-            # Save processed shorts_data as CSV for downstream scripts
-            processed_shorts_path = os.path.join(tmpdir, 'processed_shorts.csv')
-            pd.DataFrame(processed['shorts_data'])[
-                [
-                    'video_id', 'title', 'published_at', 'date', 'time', 'hour',
-                    'duration_seconds', 'view_count', 'like_count', 'comment_count', 'engagement_rate',
-                    'has_hashtags', 'hashtag_count', 'has_emojis', 'emoji_count',
-                    'clean_title', 'num_words',
-                    'sentiment_polarity', 'sentiment', 'day_of_week'
-                ]
-            ].to_csv(processed_shorts_path, index=False)
-            shutil.copy(processed_shorts_path, 'data/processed_shorts.csv')
+            sub_stats_df = upload.rows
             
-            if is_channel_only:
-                # Channel-only analysis - return data
-                response_data = {
-                    'success': True,
-                    'data': processed,
-                    'message': 'Channel analysis completed successfully.'
-                }
-                return jsonify(response_data)
-            else:
-                # Full analysis with CSV
-                sub_peaks_path = os.path.join(tmpdir, 'sub_peaks.csv')
-                attributions_path = os.path.join(tmpdir, 'attributions.csv')
-                shorts_by_day_path = os.path.join(tmpdir, 'shorts_by_day.csv')
-                
-                # Run analysis scripts
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                try:
-                    result = subprocess.run([sys.executable, os.path.join(script_dir, 'generate_sub_peaks.py'), csv_path, sub_peaks_path], 
-                                          check=True, capture_output=True, text=True, cwd=script_dir)
-                except subprocess.CalledProcessError as e:
-                    print(f"DEBUG: generate_sub_peaks.py failed with error: {e}")
-                    print(f"DEBUG: stdout: {e.stdout}")
-                    print(f"DEBUG: stderr: {e.stderr}")
-                    raise
-                
-                try:
-                    result = subprocess.run([sys.executable, os.path.join(script_dir, 'generate_attributions.py'), sub_peaks_path, processed_shorts_path, attributions_path], 
-                                          check=True, capture_output=True, text=True, cwd=script_dir)
-                except subprocess.CalledProcessError as e:
-                    print(f"DEBUG: generate_attributions.py failed with error: {e}")
-                    print(f"DEBUG: stdout: {e.stdout}")
-                    print(f"DEBUG: stderr: {e.stderr}")
-                    raise
-                
-                try:
-                    result = subprocess.run([sys.executable, os.path.join(script_dir, 'generate_shorts_by_day.py'), processed_shorts_path, shorts_by_day_path], 
-                                          check=True, capture_output=True, text=True, cwd=script_dir)
-                except subprocess.CalledProcessError as e:
-                    print(f"DEBUG: generate_shorts_by_day.py failed with error: {e}")
-                    print(f"DEBUG: stdout: {e.stdout}")
-                    print(f"DEBUG: stderr: {e.stderr}")
-                    raise
-                
-                # Load outputs
-                sub_peaks_df = pd.read_csv(sub_peaks_path)
-                
-                # Check if attributions file contains an error message
-                try:
-                    attributions_df = pd.read_csv(attributions_path)
-                    if 'error' in attributions_df.columns and 'message' in attributions_df.columns:
-                        error_row = attributions_df.iloc[0]
-                        if error_row['error'] == 'no_overlap':
-                            return jsonify({'error': 'No date overlap between subscriber peaks and shorts data. Please ensure the uploaded CSV file matches the channel ID.'}), 400
-                        elif error_row['error'] == 'no_attributions':
-                            return jsonify({'error': 'No attributions found. The subscriber peaks may not align with the shorts data.'}), 400
-                except Exception as e:
-                    return jsonify({'error': 'Failed to process attributions data.'}), 500
-                
-                shorts_by_day_df = pd.read_csv(shorts_by_day_path)
-                sub_stats_df = pd.read_csv(csv_path)
-                
-                # Convert to records
-                sub_peaks = sub_peaks_df.to_dict('records')
-                attributions = attributions_df.to_dict('records')
-                shorts_by_day = shorts_by_day_df.to_dict('records')
-                sub_stats = sub_stats_df.to_dict('records')
-                
-                response_data = {
-                    'success': True,
-                    'data': processed,
-                    'sub_peaks': sub_peaks,
-                    'attributions': attributions,
-                    'shorts_by_day': shorts_by_day,
-                    'sub_stats': sub_stats,
-                    'message': 'Analysis completed successfully.'
-                }
-                return jsonify(response_data)
+            sub_stats = frame_to_records(sub_stats_df)
+            
+            if response_format == 'lean':
+                sections = dict(analysis_sections(processed, coverage), sub_peaks=results['sub_peaks'],
+                                attributions=attributions, sub_stats=sub_stats, csv_validation=upload.summary())
+                return lean_response(sections, requested_sections, 'Analysis completed successfully.')
+            response_data = {
+                'success': True,
+                'data': processed,
+                'sub_peaks': results['sub_peaks'],
+                'attributions': attributions,
+                'shorts_by_day': results['shorts_by_day'],
+                'sub_stats': sub_stats,
+                'csv_validation': upload.summary(),
+                'message': 'Analysis completed successfully.'
+            }
+            if mode == 'preview':
+                response_data['coverage'] = coverage
+            return jsonify(response_data)
             
     except Exception as e:
         import traceback
@@ -384,269 +654,699 @@ def analyze_channel():
         print(f"DEBUG: Traceback: {traceback.format_exc()}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analysis/<analysis_id>', methods=['GET'])
+def get_analysis_sections(analysis_id):
+    """Sections of an earlier response=lean analysis, e.g. ?sections=shorts_data,sub_stats (default all)."""
+    if not re.fullmatch(r'[0-9a-f]{64}', analysis_id):
+        return jsonify({'error': 'Invalid analysis ID.'}), 400
+    try:
+        requested = parse_sections(request.args.get('sections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    names = result_cache.get_text(analysis_id, result_cache.SECTION_CACHE_DIR)
+    if names is None:
+        return jsonify({'error': 'Analysis not found or expired; run /api/analyze again.'}), 404
+    names = json.loads(names)
+    sections = {}
+    for name in names if requested is None else [name for name in requested if name in names]:
+        sections[name] = result_cache.get_text(f'{analysis_id}.{name}', result_cache.SECTION_CACHE_DIR)
+        if sections[name] is None:
+            return jsonify({'error': 'Analysis not found or expired; run /api/analyze again.'}), 404
+    return json_body({'analysis_id': analysis_id}, sections)
+
 @app.route('/api/shorts_data', methods=['GET'])
+@cached_by_dataset
 def get_processed_shorts_data():
     print("DEBUG: /api/shorts_data endpoint called")
-    processed_shorts_path = 'data/processed_shorts.csv'
-    if not os.path.exists(processed_shorts_path):
-        print("DEBUG: processed_shorts.csv not found")
+    df = dataset_store.load_frame()
+    if df is None:
+        print("DEBUG: No processed shorts dataset found")
         return jsonify({'data': []})
-    df = pd.read_csv(processed_shorts_path)
     
     # Replace NaN values with None for JSON serialization
     df = df.replace([np.nan, np.inf, -np.inf], None)
     
     data = df.to_dict('records')
-    print(f"DEBUG: Returning {len(data)} records from processed_shorts.csv")
+    print(f"DEBUG: Returning {len(data)} records from processed shorts dataset")
     return jsonify({'data': data})
 
+DASHBOARD_FILTER_KEYS = ('hashtag_filter', 'emoji_filter', 'sentiment_filter')
+STAT_QUANTILES = {'sum': None, 'median': 0.5, 'p90': 0.9}
+TIME_BUCKETS = [
+    ('Early Morning (6-9 AM)', range(6, 9)),
+    ('Morning (9-12 PM)', range(9, 12)),
+    ('Afternoon (12-3 PM)', range(12, 15)),
+    ('Late Afternoon (3-6 PM)', range(15, 18)),
+    ('Evening (6-9 PM)', range(18, 21)),
+    ('Night (9-12 AM)', list(range(21, 24)) + list(range(0, 6))),
+]
+
+def parse_dashboard_filters(source):
+    """Normalize dashboard filters from query args or a JSON filter spec.
+
+    Returns a dict with start_date/end_date and the lower-cased filter values,
+    None for anything not given.
+    """
+    filters = {'start_date': source.get('start_date'), 'end_date': source.get('end_date')}
+    for key in DASHBOARD_FILTER_KEYS:
+        value = source.get(key)
+        filters[key] = str(value).lower() if value is not None else None
+    return filters
+
+def apply_dashboard_filters(df, filters):
+    """Apply the date range and hashtag/emoji/sentiment filters to a shorts DataFrame.
+
+    Returns a filtered frame and leaves df itself untouched, since it may be the
+    worker's shared frame from dataset_store.load_frame.
+    """
+    # Filter data by date range if provided
+    if filters['start_date'] and filters['end_date']:
+        print(f"DEBUG: Filtering data from {filters['start_date']} to {filters['end_date']}")
+        dates = pd.to_datetime(df['date'])
+        df = df[(dates >= filters['start_date']) & (dates <= filters['end_date'])]
+        print(f"DEBUG: Date filtered data contains {len(df)} records")
+    
+    # Apply hashtag filter if provided
+    if filters['hashtag_filter'] is not None:
+        has_hashtags = filters['hashtag_filter'] == 'true'
+        df = df[df['has_hashtags'] == has_hashtags]
+        print(f"DEBUG: Filtered by hashtags (has_hashtags={has_hashtags}), {len(df)} records remaining")
+    
+    # Apply emoji filter if provided
+    if filters['emoji_filter'] is not None:
+        has_emojis = filters['emoji_filter'] == 'true'
+        df = df[df['has_emojis'] == has_emojis]
+        print(f"DEBUG: Filtered by emojis (has_emojis={has_emojis}), {len(df)} records remaining")
+    
+    # Apply sentiment filter if provided
+    if filters['sentiment_filter'] is not None:
+        df = df[df['sentiment'] == filters['sentiment_filter']]
+        print(f"DEBUG: Filtered by sentiment ({filters['sentiment_filter']}), {len(df)} records remaining")
+    
+    return df
+
+# (dataset content digest, start date, end date) -> merged sketches, oldest first
+_merged_sketches = {}
+_merged_sketches_lock = threading.Lock()
+MERGED_SKETCH_CACHE_SIZE = 16
+
+def dashboard_sketches(filters, stat, daily, version):
+    """Return merged daily sketches for a quantile request, or None to compute it exactly.
+
+    daily is the 'sketches' sidecar loaded with the frame (dataset_store.load_generation),
+    and version that generation's version record. Sketches are stored per day,
+    so they answer any date range but not the hashtag/emoji/sentiment filters;
+    filtered requests fall back to the exact path. Merged sketches are kept per
+    dataset content digest and date range, so repeated requests (and median and
+    p90 of the same range) merge only once.
+    """
+    if daily is None or STAT_QUANTILES.get(stat) is None or \
+            any(filters[key] is not None for key in DASHBOARD_FILTER_KEYS):
+        return None
+    start_date = end_date = None
+    if filters['start_date'] and filters['end_date']:
+        start_date = pd.Timestamp(filters['start_date']).strftime('%Y-%m-%d')
+        end_date = pd.Timestamp(filters['end_date']).strftime('%Y-%m-%d')
+    # Version records written before digests existed are merged every time
+    digest = version.get('digest') if version else None
+    key = (digest, start_date, end_date)
+    if digest is not None:
+        with _merged_sketches_lock:
+            merged = _merged_sketches.get(key)
+        if merged is not None:
+            return merged
+    merged = merge_daily_sketches(daily, start_date, end_date)
+    if digest is not None:
+        with _merged_sketches_lock:
+            _merged_sketches[key] = merged
+            while len(_merged_sketches) > MERGED_SKETCH_CACHE_SIZE:
+                _merged_sketches.pop(next(iter(_merged_sketches)))
+    return merged
+
+def select_batch_rows(groups, dates, filters):
+    """Return the sorted row positions matching one filter spec.
+
+    groups maps (has_hashtags, has_emojis, sentiment) to row positions and is built
+    once per batch, so each spec only unions the matching groups instead of
+    re-filtering the whole table. Works the same on the shorts frame and on its
+    aggregate_dashboard_cells, with dates holding each row's (or cell's) date.
+    """
+    wanted_hashtags = filters['hashtag_filter'] == 'true' if filters['hashtag_filter'] is not None else None
+    wanted_emojis = filters['emoji_filter'] == 'true' if filters['emoji_filter'] is not None else None
+    parts = [
+        positions for (has_hashtags, has_emojis, sentiment), positions in groups.items()
+        if (wanted_hashtags is None or has_hashtags == wanted_hashtags)
+        and (wanted_emojis is None or has_emojis == wanted_emojis)
+        and (filters['sentiment_filter'] is None or sentiment == filters['sentiment_filter'])
+    ]
+    positions = np.sort(np.concatenate(parts)) if parts else np.array([], dtype=np.intp)
+    if filters['start_date'] and filters['end_date']:
+        selected = dates[positions]
+        in_range = (selected >= np.datetime64(pd.Timestamp(filters['start_date']))) & \
+                   (selected <= np.datetime64(pd.Timestamp(filters['end_date'])))
+        positions = positions[in_range]
+    return positions
+
+DASHBOARD_CELL_KEYS = ['has_hashtags', 'has_emojis', 'sentiment', 'date', 'hour', 'day_of_week']
+# finite_views is view_count without infinite values, for the with/without hashtag and emoji averages
+DASHBOARD_CELL_COLUMNS = ['view_count', 'like_count', 'comment_count', 'num_words', 'hashtag_count',
+                          'emoji_count', 'finite_views']
+
+def aggregate_dashboard_cells(df):
+    """Sum the additive dashboard columns per (filter keys, date, hour, weekday) cell.
+
+    Returns one row per cell with the cell keys, month_start, its number of
+    shorts (rows) and <column>_sum/<column>_count for every DASHBOARD_CELL_COLUMNS
+    entry. Counts, sums and means of any filter combination are combined from
+    these cells, so a batch aggregates its rows once instead of once per spec. The
+    date is part of the key because date range filters select whole days.
+    """
+    frame = pd.DataFrame({key: df[key] for key in DASHBOARD_CELL_KEYS})
+    frame['date'] = pd.to_datetime(frame['date'])
+    for column in DASHBOARD_CELL_COLUMNS[:-1]:
+        frame[column] = df[column]
+    frame['finite_views'] = df['view_count'].replace([np.inf, -np.inf], np.nan)
+    grouped = frame.groupby(DASHBOARD_CELL_KEYS, dropna=False, sort=False)
+    aggregations = {}
+    for column in DASHBOARD_CELL_COLUMNS:
+        aggregations[f'{column}_sum'] = (column, 'sum')
+        aggregations[f'{column}_count'] = (column, 'count')
+    cells = grouped.agg(**aggregations)
+    cells['rows'] = grouped.size()
+    cells = cells.reset_index()
+    cells['month_start'] = cells['date'].dt.to_period('M').dt.start_time
+    return cells
+
+def cell_mean(cells, column):
+    """Mean of a DASHBOARD_CELL_COLUMNS column over some cells (NaN if it has no values)."""
+    count = cells[f'{column}_count'].sum()
+    return cells[f'{column}_sum'].sum() / count if count > 0 else np.nan
+
+def cell_means(cells, by, columns):
+    """Per-group means of DASHBOARD_CELL_COLUMNS columns over cells grouped by `by`."""
+    totals = cells.groupby(by)[[f'{column}_{part}' for column in columns for part in ('sum', 'count')]].sum()
+    return pd.DataFrame({column: totals[f'{column}_sum'] / totals[f'{column}_count'] for column in columns})
+
+def compute_dashboard_data(df, sentiment_filter=None, stat='sum', sketches=None, cells=None):
+    """Calculate every dashboard section for an already filtered shorts DataFrame.
+
+    stat selects how heat map cells and time buckets are summarized ('sum',
+    'median' or 'p90'). For quantiles, sketches (from dashboard_sketches) answers
+    them from the merged daily sketches; without it they are computed exactly.
+    Counts, sums and means come from cells (aggregate_dashboard_cells of the
+    same rows), which is built from df when not given; df itself is only read
+    for the top shorts, the scatter plot and exact quantiles, and never modified.
+    """
+    if cells is None:
+        cells = aggregate_dashboard_cells(df)
+    
+    # Calculate dashboard statistics
+    total_shorts = len(df)
+    avg_views = float(cell_mean(cells, 'view_count')) if total_shorts > 0 else 0
+    avg_likes = float(cell_mean(cells, 'like_count')) if total_shorts > 0 else 0
+    avg_comments = float(cell_mean(cells, 'comment_count')) if total_shorts > 0 else 0
+    avg_words = float(cell_mean(cells, 'num_words')) if total_shorts > 0 else 0
+    
+    # Calculate average shorts per day
+    shorts_per_day = cells.groupby('date')['rows'].sum()
+    avg_shorts_per_day = float(shorts_per_day.mean()) if len(shorts_per_day) > 0 else 0
+    
+    # Hashtag statistics
+    cells_with_hashtags = cells[cells['has_hashtags'] == True]
+    cells_without_hashtags = cells[cells['has_hashtags'] == False]
+    shorts_with_hashtags = int(cells_with_hashtags['rows'].sum())
+    hashtag_usage_percentage = (shorts_with_hashtags / total_shorts) * 100 if total_shorts > 0 else 0
+    avg_hashtags_per_video = float(cell_mean(cells_with_hashtags, 'hashtag_count')) if shorts_with_hashtags > 0 else 0
+    
+    # Hashtag average views
+    # Handle NaN and infinite values
+    avg_views_with_hashtags = float(cell_mean(cells_with_hashtags, 'finite_views')) \
+        if cells_with_hashtags['finite_views_count'].sum() > 0 else 0
+    avg_views_without_hashtags = float(cell_mean(cells_without_hashtags, 'finite_views')) \
+        if cells_without_hashtags['finite_views_count'].sum() > 0 else 0
+    
+    # Emoji statistics
+    cells_with_emojis = cells[cells['has_emojis'] == True]
+    cells_without_emojis = cells[cells['has_emojis'] == False]
+    shorts_with_emojis = int(cells_with_emojis['rows'].sum())
+    emoji_usage_percentage = (shorts_with_emojis / total_shorts) * 100 if total_shorts > 0 else 0
+    avg_emojis_per_video = float(cell_mean(cells_with_emojis, 'emoji_count')) if shorts_with_emojis > 0 else 0
+    
+    # Emoji average views
+    # Handle NaN and infinite values
+    avg_views_with_emojis = float(cell_mean(cells_with_emojis, 'finite_views')) \
+        if cells_with_emojis['finite_views_count'].sum() > 0 else 0
+    avg_views_without_emojis = float(cell_mean(cells_without_emojis, 'finite_views')) \
+        if cells_without_emojis['finite_views_count'].sum() > 0 else 0
+    
+    # Top performing shorts (by views)
+    top_shorts = df.nlargest(5, 'view_count')[['title', 'view_count', 'like_count', 'comment_count']].to_dict('records')
+    print(f"DEBUG: Top shorts after filtering: {len(top_shorts)} shorts")
+    
+    # Sentiment analysis
+    if sentiment_filter is not None:
+        # If filtering by sentiment, only show that sentiment's count
+        sentiment_stats = {sentiment_filter.lower(): len(df)}
+    else:
+        # If no sentiment filter, show all sentiment counts
+        sentiment_stats = cells.groupby('sentiment')['rows'].sum().to_dict()
+    print(f"DEBUG: Sentiment stats after filtering: {sentiment_stats}")
+    
+
+    
+    # Videos posted per day of the week (horizontal bar chart)
+    videos_per_day = cells.groupby('day_of_week')['rows'].sum().to_dict()
+    print(f"DEBUG: videos_per_day data: {videos_per_day}")
+    
+    # Time distribution analysis (success by posting time)
+    # Group by hour and calculate average views
+    time_success_data = cell_means(cells, 'hour', ['view_count'])['view_count'] \
+        .replace([np.nan, np.inf, -np.inf], 0).to_dict()
+    print(f"DEBUG: time_success_data: {time_success_data}")
+    
+    # Create time buckets for better visualization
+    # stat=sum keeps the mean views per bucket; median/p90 report that quantile instead
+    quantile = STAT_QUANTILES.get(stat)
+    time_buckets = {}
+    for label, hours in TIME_BUCKETS:
+        if quantile is None:
+            time_buckets[label] = cell_mean(cells[cells['hour'].isin(hours)], 'view_count')
+        elif sketches is not None:
+            bucket_sketch = KLLSketch(DEFAULT_K)
+            for (hour, _), cell_sketch in sketches['views'].items():
+                if hour in hours:
+                    bucket_sketch.merge(cell_sketch)
+            time_buckets[label] = bucket_sketch.quantile(quantile)
+        else:
+            time_buckets[label] = exact_quantile(df[df['hour'].isin(hours)]['view_count'], quantile)
+    # Replace NaN values with 0
+    time_buckets = {k: v if v is not None and not pd.isna(v) else 0 for k, v in time_buckets.items()}
+    print(f"DEBUG: time_buckets: {time_buckets}")
+    
+    # Create heat map data for different metrics (hour vs day of week)
+    heat_map_data = {
+        'videos_posted': {},
+        'views': {},
+        'likes': {},
+        'comments': {}
+    }
+    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    
+    # One groupby over (hour, day) instead of masking the frame for each of the 168 cells
+    slot_totals = cells.groupby(['hour', 'day_of_week'])
+    cell_counts = slot_totals['rows'].sum().to_dict()
+    if quantile is None:
+        # Total values (sum) show the total volume of engagement at each time slot
+        cell_values = {metric: slot_totals[f'{column}_sum'].sum().to_dict() for metric, column in SKETCH_METRICS.items()}
+    elif sketches is not None:
+        cell_values = {metric: {key: cell_sketch.quantile(quantile) for key, cell_sketch in sketches[metric].items()}
+                       for metric in SKETCH_METRICS}
+    else:
+        cell_groups = df.groupby(['hour', 'day_of_week'])
+        cell_values = {metric: cell_groups[column].agg(lambda values: exact_quantile(values, quantile)).to_dict()
+                       for metric, column in SKETCH_METRICS.items()}
+    
+    for hour in range(24):
+        heat_map_data['videos_posted'][hour] = {}
+        heat_map_data['views'][hour] = {}
+        heat_map_data['likes'][hour] = {}
+        heat_map_data['comments'][hour] = {}
+        
+        for day in day_order:
+            # For videos posted, count the number of videos
+            heat_map_data['videos_posted'][hour][day] = int(cell_counts.get((hour, day), 0))
+            for metric in SKETCH_METRICS:
+                heat_map_data[metric][hour][day] = int(cell_values[metric].get((hour, day)) or 0)
+    
+    print(f"DEBUG: heat_map_data created with {len(heat_map_data)} metrics")
+    
+    # Prepare scatter plot data (duration vs engagement rate)
+    scatter_data = {
+        'duration_vs_engagement': df[['duration_seconds', 'engagement_rate']].dropna().to_dict('records'),
+    }
+    print(f"DEBUG: Scatter data points after filtering: {len(scatter_data['duration_vs_engagement'])} points")
+    
+        # Prepare time series data for sparklines
+    # Group by month (cells carry their month_start) and calculate monthly averages
+    monthly_stats = cell_means(cells, 'month_start', ['view_count', 'like_count', 'comment_count']).reset_index()
+    
+    # Replace NaN values with 0 for JSON serialization
+    monthly_stats = monthly_stats.replace([np.nan, np.inf, -np.inf], 0)
+    
+    # Rename week_start back to date for frontend compatibility
+    monthly_stats = monthly_stats.rename(columns={'month_start': 'date'})
+    
+    # Sort by date and format for frontend
+    monthly_stats = monthly_stats.sort_values('date')
+    time_series_data = {
+        'views': monthly_stats[['date', 'view_count']].to_dict('records'),
+        'likes': monthly_stats[['date', 'like_count']].to_dict('records'),
+        'comments': monthly_stats[['date', 'comment_count']].to_dict('records')
+    }
+    
+    # Format numbers for display
+    def format_number(num):
+        if num >= 1000000:
+            return f"{num/1000000:.1f}M"
+        elif num >= 1000:
+            return f"{num/1000:.1f}K"
+        else:
+            return f"{num:.0f}"
+    
+    dashboard_data = {
+        'summary': {
+            'total_shorts': total_shorts,
+            'avg_views': format_number(avg_views),
+            'avg_likes': format_number(avg_likes),
+            'avg_comments': format_number(avg_comments),
+            'avg_words': round(avg_words, 2),
+            'avg_shorts_per_day': round(avg_shorts_per_day, 1),
+            'avg_views_raw': avg_views,
+            'avg_likes_raw': avg_likes,
+            'avg_comments_raw': avg_comments
+        },
+        'hashtag_stats': {
+            'usage_percentage': round(hashtag_usage_percentage, 1),
+            'non_usage_percentage': round(100 - hashtag_usage_percentage, 1),
+            'avg_hashtags_per_video': round(avg_hashtags_per_video, 1),
+            'avg_views_with': round(avg_views_with_hashtags, 1),
+            'avg_views_without': round(avg_views_without_hashtags, 1)
+        },
+        'emoji_stats': {
+            'usage_percentage': round(emoji_usage_percentage, 1),
+            'non_usage_percentage': round(100 - emoji_usage_percentage, 1),
+            'avg_emojis_per_video': round(avg_emojis_per_video, 1),
+            'avg_views_with': round(avg_views_with_emojis, 1),
+            'avg_views_without': round(avg_views_without_emojis, 1)
+        },
+        'sentiment_stats': sentiment_stats,
+        'videos_per_day': videos_per_day,
+        'time_success_data': time_success_data,
+        'time_buckets': time_buckets,
+        'heat_map_data': heat_map_data,
+        'top_shorts': top_shorts,
+        'scatter_data': scatter_data,
+        'time_series_data': time_series_data
+    }
+    return dashboard_data
+
 @app.route('/api/dashboard_data', methods=['GET'])
+@profiled
+@cached_by_dataset
 def get_dashboard_data():
-    """Get processed dashboard data from processed_shorts.csv with calculated statistics."""
+    """Get processed dashboard data from the processed shorts dataset with calculated statistics."""
     print("DEBUG: /api/dashboard_data endpoint called")
-    processed_shorts_path = 'data/processed_shorts.csv'
+    # Frame, sketches and coverage of one generation, even if a write lands meanwhile.
+    # The sketches are large once parsed, so a worker only loads them for quantile stats.
+    stat = request.args.get('stat', 'sum').lower()
+    wanted = ('sketches', 'coverage') if STAT_QUANTILES.get(stat) is not None else ('coverage',)
+    version, df, sidecars = dataset_store.load_generation(sidecars=wanted)
     
-    if not os.path.exists(processed_shorts_path):
-        print("DEBUG: processed_shorts.csv not found")
+    if df is None:
+        print("DEBUG: No processed shorts dataset found")
         return jsonify({'error': 'No processed shorts data available'}), 404
     
     try:
-        df = pd.read_csv(processed_shorts_path)
-        
-        # Get date range parameters from query string
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Get filter parameters from query string (support multiple filters)
-        hashtag_filter = request.args.get('hashtag_filter')  # 'true', 'false', or None
-        emoji_filter = request.args.get('emoji_filter')  # 'true', 'false', or None
-        sentiment_filter = request.args.get('sentiment_filter')  # 'positive', 'negative', 'neutral', or None
+        # Get date range and filter parameters from query string (support multiple filters)
+        filters = parse_dashboard_filters(request.args)
+        print(f"DEBUG: Received filters - hashtag: {filters['hashtag_filter']}, emoji: {filters['emoji_filter']}, sentiment: {filters['sentiment_filter']}")
         
-        print(f"DEBUG: Received filters - hashtag: {hashtag_filter}, emoji: {emoji_filter}, sentiment: {sentiment_filter}")
+        if stat not in STAT_QUANTILES:
+            return jsonify({'error': f"stat must be one of: {', '.join(STAT_QUANTILES)}"}), 400
         
-        # Filter data by date range if provided
-        if start_date and end_date:
-            print(f"DEBUG: Filtering data from {start_date} to {end_date}")
-            df['date'] = pd.to_datetime(df['date'])
-            df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
-            print(f"DEBUG: Date filtered data contains {len(df)} records")
+        df = apply_dashboard_filters(df, filters)
+        dashboard_data = compute_dashboard_data(df, filters['sentiment_filter'], stat,
+                                                dashboard_sketches(filters, stat, sidecars.get('sketches'), version))
+        # Every dataset stores its coverage, but only a partial (preview) one is reported,
+        # so the dashboard can say so
+        coverage = sidecars['coverage']
+        if coverage is not None and not coverage['complete']:
+            dashboard_data['coverage'] = coverage
         
-        # Apply hashtag filter if provided
-        if hashtag_filter is not None:
-            has_hashtags = hashtag_filter.lower() == 'true'
-            df = df[df['has_hashtags'] == has_hashtags]
-            print(f"DEBUG: Filtered by hashtags (has_hashtags={has_hashtags}), {len(df)} records remaining")
-        
-        # Apply emoji filter if provided
-        if emoji_filter is not None:
-            has_emojis = emoji_filter.lower() == 'true'
-            df = df[df['has_emojis'] == has_emojis]
-            print(f"DEBUG: Filtered by emojis (has_emojis={has_emojis}), {len(df)} records remaining")
-        
-        # Apply sentiment filter if provided
-        if sentiment_filter is not None:
-            print(f"DEBUG: Before sentiment filtering - unique sentiment values: {df['sentiment'].unique()}")
-            print(f"DEBUG: Looking for sentiment: '{sentiment_filter.lower()}'")
-            df = df[df['sentiment'] == sentiment_filter.lower()]
-            print(f"DEBUG: Filtered by sentiment ({sentiment_filter}), {len(df)} records remaining")
-            print(f"DEBUG: After filtering - unique sentiment values: {df['sentiment'].unique()}")
-        
-        # Calculate dashboard statistics
-        total_shorts = len(df)
-        avg_views = float(df['view_count'].mean()) if total_shorts > 0 else 0
-        avg_likes = float(df['like_count'].mean()) if total_shorts > 0 else 0
-        avg_comments = float(df['comment_count'].mean()) if total_shorts > 0 else 0
-        avg_words = float(df['num_words'].mean()) if total_shorts > 0 else 0
-        
-        # Calculate average shorts per day
-        df['date'] = pd.to_datetime(df['date'])
-        shorts_per_day = df.groupby('date').size()
-        avg_shorts_per_day = float(shorts_per_day.mean()) if len(shorts_per_day) > 0 else 0
-        
-        # Hashtag statistics
-        shorts_with_hashtags = df[df['has_hashtags'] == True]
-        shorts_without_hashtags = df[df['has_hashtags'] == False]
-        hashtag_usage_percentage = (len(shorts_with_hashtags) / total_shorts) * 100 if total_shorts > 0 else 0
-        avg_hashtags_per_video = float(shorts_with_hashtags['hashtag_count'].mean()) if len(shorts_with_hashtags) > 0 else 0
-        
-        # Hashtag average views
-        # Handle NaN and infinite values
-        hashtag_views_with = shorts_with_hashtags['view_count'].replace([np.inf, -np.inf], np.nan).dropna()
-        hashtag_views_without = shorts_without_hashtags['view_count'].replace([np.inf, -np.inf], np.nan).dropna()
-        
-        avg_views_with_hashtags = float(hashtag_views_with.mean()) if len(hashtag_views_with) > 0 else 0
-        avg_views_without_hashtags = float(hashtag_views_without.mean()) if len(hashtag_views_without) > 0 else 0
-        
-        # Emoji statistics
-        shorts_with_emojis = df[df['has_emojis'] == True]
-        shorts_without_emojis = df[df['has_emojis'] == False]
-        emoji_usage_percentage = (len(shorts_with_emojis) / total_shorts) * 100 if total_shorts > 0 else 0
-        avg_emojis_per_video = float(shorts_with_emojis['emoji_count'].mean()) if len(shorts_with_emojis) > 0 else 0
-        
-        # Emoji average views
-        # Handle NaN and infinite values
-        emoji_views_with = shorts_with_emojis['view_count'].replace([np.inf, -np.inf], np.nan).dropna()
-        emoji_views_without = shorts_without_emojis['view_count'].replace([np.inf, -np.inf], np.nan).dropna()
-        
-        avg_views_with_emojis = float(emoji_views_with.mean()) if len(emoji_views_with) > 0 else 0
-        avg_views_without_emojis = float(emoji_views_without.mean()) if len(emoji_views_without) > 0 else 0
-        
-        # Top performing shorts (by views)
-        top_shorts = df.nlargest(5, 'view_count')[['title', 'view_count', 'like_count', 'comment_count']].to_dict('records')
-        print(f"DEBUG: Top shorts after filtering: {len(top_shorts)} shorts")
-        
-        # Sentiment analysis
-        if sentiment_filter is not None:
-            # If filtering by sentiment, only show that sentiment's count
-            sentiment_stats = {sentiment_filter.lower(): len(df)}
-        else:
-            # If no sentiment filter, show all sentiment counts
-            sentiment_stats = df['sentiment'].value_counts().to_dict()
-        print(f"DEBUG: Sentiment stats after filtering: {sentiment_stats}")
+        print(f"DEBUG: Returning dashboard data with {dashboard_data['summary']['total_shorts']} shorts")
+        return jsonify(dashboard_data)
         
+    except Exception as e:
+        print(f"DEBUG: Error processing dashboard data: {str(e)}")
+        return jsonify({'error': f'Failed to process dashboard data: {str(e)}'}), 500
 
+@app.route('/api/hashtags', methods=['GET'])
+@cached_by_dataset
+def get_hashtag_performance():
+    """Per-hashtag count and mean/median views and engagement for the dashboard filters.
+
+    Answered from the hashtag inverted index built at ingest; supports the same
+    query parameters as /api/dashboard_data plus limit and min_count.
+    """
+    print("DEBUG: /api/hashtags endpoint called")
+    # Row IDs in the index are only valid for the table of the same generation
+    _, table, sidecars = dataset_store.open_generation(sidecars=('index',))
+    index = sidecars.get('index')
+    if table is None or index is None:
+        # Legacy CSV datasets have no index yet; build one in memory
+        df = dataset_store.load_frame()
+        if df is None:
+            return jsonify({'error': 'No processed shorts data available'}), 404
+        index = hashtag_index.build_index(df)
+        views = df['view_count'].to_numpy()
+        engagement = df['engagement_rate'].to_numpy()
+    else:
+        views = table.column('view_count').to_numpy()
+        engagement = table.column('engagement_rate').to_numpy()
+    
+    try:
+        filters = parse_dashboard_filters(request.args)
+        if filters['start_date'] and filters['end_date']:
+            filters['start_date'] = pd.Timestamp(filters['start_date']).strftime('%Y-%m-%d')
+            filters['end_date'] = pd.Timestamp(filters['end_date']).strftime('%Y-%m-%d')
+        limit = int(request.args.get('limit', 50))
+        min_count = int(request.args.get('min_count', 1))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    
+    rows = hashtag_index.filter_rows(index, filters)
+    hashtags = hashtag_index.hashtag_stats(index, views, engagement, rows, min_count)
+    print(f"DEBUG: Returning {min(len(hashtags), limit)} of {len(hashtags)} hashtags")
+    return jsonify({
+        'total_shorts': int(index['rows'] if rows is None else len(rows)),
+        'total_hashtags': len(hashtags),
+        'hashtags': hashtags[:limit],
+    })
+
+@app.route('/api/title_clusters', methods=['GET'])
+@cached_by_dataset
+def get_title_clusters():
+    """Clusters of near-duplicate titles with aggregate performance.
+
+    Accepts the /api/dashboard_data filters plus min_size (default 2) and limit
+    (default 50). Clusters are assigned at ingest by MinHash/LSH over clean_title.
+    """
+    print("DEBUG: /api/title_clusters endpoint called")
+    df = dataset_store.load_frame()
+    if df is None:
+        return jsonify({'error': 'No processed shorts data available'}), 404
+    try:
+        min_size = int(request.args.get('min_size', 2))
+        limit = int(request.args.get('limit', 50))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    
+    if 'title_cluster' not in df.columns:
+        # Datasets written before clustering existed; cluster in memory without persisting
+        df = df.assign(title_cluster=assign_title_clusters(df))
+    df = apply_dashboard_filters(df, parse_dashboard_filters(request.args))
+    
+    sizes = df['title_cluster'].value_counts()
+    cluster_ids = sizes[sizes >= min_size].index
+    clustered = df[df['title_cluster'].isin(cluster_ids)].sort_values('published_at')
+    clusters = []
+    for cluster_id, members in clustered.groupby('title_cluster', sort=False):
+        clusters.append({
+            'cluster_id': cluster_id,
+            'size': int(len(members)),
+            'total_views': int(members['view_count'].sum()),
+            'mean_views': float(members['view_count'].mean()),
+            'max_views': int(members['view_count'].max()),
+            'min_views': int(members['view_count'].min()),
+            'mean_engagement_rate': float(members['engagement_rate'].mean()),
+            'first_published': str(members['published_at'].iloc[0]),
+            'last_published': str(members['published_at'].iloc[-1]),
+            'videos': members[['video_id', 'title', 'published_at', 'view_count', 'engagement_rate']]
+                .replace([np.nan, np.inf, -np.inf], None).to_dict('records'),
+        })
+    clusters.sort(key=lambda cluster: (-cluster['size'], -cluster['total_views']))
+    print(f"DEBUG: Returning {min(len(clusters), limit)} of {len(clusters)} title clusters")
+    return jsonify({'total_clusters': len(clusters), 'clusters': clusters[:limit]})
+
+@app.route('/api/percentiles', methods=['GET'])
+def get_percentiles():
+    """Percentile ranks of a video (or of given metric values) against every analyzed channel.
+
+    Pass video_id (looked up in channel_id's dataset, default the current one),
+    or any of views, engagement_rate, duration and hour directly.
+    """
+    print("DEBUG: /api/percentiles endpoint called")
+    index = percentile_index.load_index()
+    if index is None:
+        return jsonify({'error': 'No channels have been analyzed yet'}), 404
+    
+    video_id = request.args.get('video_id')
+    channel_id = request.args.get('channel_id')
+    if channel_id is not None and not CHANNEL_ID_PATTERN.fullmatch(channel_id):
+        return jsonify({'error': 'Invalid channel ID format.'}), 400
+    if video_id:
+        df = dataset_store.load_frame(channel_id)
+        if df is None:
+            return jsonify({'error': 'No processed shorts data available'}), 404
+        matches = df[df['video_id'] == video_id]
+        if matches.empty:
+            return jsonify({'error': f'Video {video_id} not found'}), 404
+        row = matches.iloc[0]
+        values = {metric: row[column] for metric, column in percentile_index.METRICS.items()}
+    else:
+        try:
+            values = {metric: float(request.args[metric]) for metric in percentile_index.METRICS
+                      if metric in request.args}
+        except ValueError as e:
+            return jsonify({'error': f'Invalid parameter: {e}'}), 400
+        if not values:
+            return jsonify({'error': 'Provide video_id or at least one of: '
+                                     + ', '.join(percentile_index.METRICS)}), 400
+    
+    return jsonify({
+        'video_id': video_id,
+        'population': {'videos': int(len(index['views'])), 'channels': len(index['channels'])},
+        'percentiles': percentile_index.rank_metrics(values, index),
+    })
+
+@app.route('/api/video_history', methods=['GET'])
+def get_video_history():
+    """Recorded statistics snapshots of one video, its view velocity and its first-hours curve.
+
+    Takes video_id, optional channel_id (default the current dataset) and hours
+    (default 48) for the early curve, measured from the video's publish time.
+    """
+    print("DEBUG: /api/video_history endpoint called")
+    video_id = request.args.get('video_id')
+    channel_id = request.args.get('channel_id')
+    if not video_id:
+        return jsonify({'error': 'video_id is required'}), 400
+    if channel_id is not None and not CHANNEL_ID_PATTERN.fullmatch(channel_id):
+        return jsonify({'error': 'Invalid channel ID format.'}), 400
+    channel_id = channel_id or dataset_store.current_channel()
+    if not channel_id:
+        return jsonify({'error': 'No channels have been analyzed yet'}), 404
+    try:
+        hours = float(request.args.get('hours', 48))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    
+    history = snapshot_store.video_history(channel_id, video_id)
+    if history.empty:
+        return jsonify({'error': f'No snapshots recorded for video {video_id}'}), 404
+    
+    published_at = None
+    df = dataset_store.load_frame(channel_id)
+    if df is not None:
+        matches = df.loc[df['video_id'] == video_id, 'published_at']
+        if not matches.empty:
+            published_at = pd.Timestamp(matches.iloc[0])
+    velocity = snapshot_store.view_velocity(history)
+    first_hours = snapshot_store.first_hours_curve(history, published_at, hours) if published_at is not None else None
+    return jsonify({
+        'video_id': video_id,
+        'channel_id': channel_id,
+        'published_at': str(published_at) if published_at is not None else None,
+        'snapshots': frame_to_records(history),
+        'velocity': frame_to_records(velocity),
+        'latest_views_per_hour': (float(velocity['views_per_hour'].iloc[-1])
+                                  if not velocity.empty and pd.notna(velocity['views_per_hour'].iloc[-1]) else None),
+        'first_hours': frame_to_records(first_hours) if first_hours is not None else None,
+    })
+
+MAX_BATCH_FILTERS = 32
+
+@app.route('/api/dashboard_batch', methods=['POST'])
+def get_dashboard_batch():
+    """Compute dashboard data for several filter specs from one dataset load.
+
+    Expects a JSON body {"filters": [{start_date, end_date, hashtag_filter,
+    emoji_filter, sentiment_filter, stat}, ...]}. Sections that come out identical for
+    every spec are returned once under "shared" and left out of each result.
+    """
+    print("DEBUG: /api/dashboard_batch endpoint called")
+    body = request.get_json(silent=True) or {}
+    specs = body.get('filters')
+    if not isinstance(specs, list) or not specs or not all(isinstance(spec, dict) for spec in specs):
+        return jsonify({'error': 'filters must be a non-empty list of filter objects.'}), 400
+    if len(specs) > MAX_BATCH_FILTERS:
+        return jsonify({'error': f'At most {MAX_BATCH_FILTERS} filter combinations per batch.'}), 400
+    
+    quantiles = any(STAT_QUANTILES.get(str(spec.get('stat', 'sum')).lower()) is not None for spec in specs)
+    version, df, sidecars = dataset_store.load_generation(sidecars=('sketches',) if quantiles else ())
+    if df is None:
+        print("DEBUG: No processed shorts dataset found")
+        return jsonify({'error': 'No processed shorts data available'}), 404
+    
+    try:
+        dates = pd.to_datetime(df['date']).to_numpy()
+        # One groupby over the combined filter keys, shared by every spec
+        groups = df.groupby(['has_hashtags', 'has_emojis', 'sentiment'], sort=False).indices
+        # Counts, sums and means are aggregated once per cell and combined per spec
+        cells = aggregate_dashboard_cells(df)
+        cell_groups = cells.groupby(['has_hashtags', 'has_emojis', 'sentiment'], sort=False).indices
+        cell_dates = cells['date'].to_numpy()
         
-        # Videos posted per day of the week (horizontal bar chart)
-        videos_per_day = df['day_of_week'].value_counts().to_dict()
-        print(f"DEBUG: videos_per_day data: {videos_per_day}")
-        
-        # Time distribution analysis (success by posting time)
-        # Group by hour and calculate average views
-        time_success_data = df.groupby('hour')['view_count'].mean().replace([np.nan, np.inf, -np.inf], 0).to_dict()
-        print(f"DEBUG: time_success_data: {time_success_data}")
-        
-        # Create time buckets for better visualization
-        time_buckets = {
-            'Early Morning (6-9 AM)': df[(df['hour'] >= 6) & (df['hour'] < 9)]['view_count'].mean(),
-            'Morning (9-12 PM)': df[(df['hour'] >= 9) & (df['hour'] < 12)]['view_count'].mean(),
-            'Afternoon (12-3 PM)': df[(df['hour'] >= 12) & (df['hour'] < 15)]['view_count'].mean(),
-            'Late Afternoon (3-6 PM)': df[(df['hour'] >= 15) & (df['hour'] < 18)]['view_count'].mean(),
-            'Evening (6-9 PM)': df[(df['hour'] >= 18) & (df['hour'] < 21)]['view_count'].mean(),
-            'Night (9-12 AM)': df[(df['hour'] >= 21) | (df['hour'] < 6)]['view_count'].mean()
-        }
-        # Replace NaN values with 0
-        time_buckets = {k: v if not pd.isna(v) else 0 for k, v in time_buckets.items()}
-        print(f"DEBUG: time_buckets: {time_buckets}")
-        
-        # Create heat map data for different metrics (hour vs day of week) with median values
-        heat_map_data = {
-            'videos_posted': {},
-            'views': {},
-            'likes': {},
-            'comments': {}
-        }
-        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        
-        for hour in range(24):
-            heat_map_data['videos_posted'][hour] = {}
-            heat_map_data['views'][hour] = {}
-            heat_map_data['likes'][hour] = {}
-            heat_map_data['comments'][hour] = {}
-            
-            for day in day_order:
-                day_hour_data = df[(df['day_of_week'] == day) & (df['hour'] == hour)]
-                if len(day_hour_data) > 0:
-                    # For videos posted, count the number of videos
-                    heat_map_data['videos_posted'][hour][day] = int(len(day_hour_data))
-                    
-                    # For other metrics, use total values (sum)
-                    # This shows the total volume of engagement at each time slot
-                    heat_map_data['views'][hour][day] = int(day_hour_data['view_count'].sum())
-                    heat_map_data['likes'][hour][day] = int(day_hour_data['like_count'].sum())
-                    heat_map_data['comments'][hour][day] = int(day_hour_data['comment_count'].sum())
-                else:
-                    heat_map_data['videos_posted'][hour][day] = 0
-                    heat_map_data['views'][hour][day] = 0
-                    heat_map_data['likes'][hour][day] = 0
-                    heat_map_data['comments'][hour][day] = 0
-        
-        print(f"DEBUG: heat_map_data created with {len(heat_map_data)} metrics")
-        
-        # Prepare scatter plot data (duration vs engagement rate)
-        scatter_data = {
-            'duration_vs_engagement': df[['duration_seconds', 'engagement_rate']].dropna().to_dict('records'),
-        }
-        print(f"DEBUG: Scatter data points after filtering: {len(scatter_data['duration_vs_engagement'])} points")
-        
-            # Prepare time series data for sparklines
-        # Group by week and calculate weekly averages
-        df['date'] = pd.to_datetime(df['date'])
-        
-        # Create week column (Monday as start of week)
-        df['month_start'] = df['date'].dt.to_period('M').dt.start_time
-        
-        monthly_stats = df.groupby('month_start').agg({
-            'view_count': 'mean',
-            'like_count': 'mean', 
-            'comment_count': 'mean'
-        }).reset_index()
-        
-        # Replace NaN values with 0 for JSON serialization
-        monthly_stats = monthly_stats.replace([np.nan, np.inf, -np.inf], 0)
-        
-        # Rename week_start back to date for frontend compatibility
-        monthly_stats = monthly_stats.rename(columns={'month_start': 'date'})
-        
-        # Sort by date and format for frontend
-        monthly_stats = monthly_stats.sort_values('date')
-        time_series_data = {
-            'views': monthly_stats[['date', 'view_count']].to_dict('records'),
-            'likes': monthly_stats[['date', 'like_count']].to_dict('records'),
-            'comments': monthly_stats[['date', 'comment_count']].to_dict('records')
-        }
-        
-        # Format numbers for display
-        def format_number(num):
-            if num >= 1000000:
-                return f"{num/1000000:.1f}M"
-            elif num >= 1000:
-                return f"{num/1000:.1f}K"
-            else:
-                return f"{num:.0f}"
+        results = []
+        for spec in specs:
+            filters = parse_dashboard_filters(spec)
+            stat = str(spec.get('stat', 'sum')).lower()
+            if stat not in STAT_QUANTILES:
+                return jsonify({'error': f"stat must be one of: {', '.join(STAT_QUANTILES)}"}), 400
+            rows = df.iloc[select_batch_rows(groups, dates, filters)]
+            spec_cells = cells.iloc[select_batch_rows(cell_groups, cell_dates, filters)]
+            result = compute_dashboard_data(rows, filters['sentiment_filter'], stat,
+                                            dashboard_sketches(filters, stat, sidecars.get('sketches'), version),
+                                            spec_cells)
+            result['filters'] = dict(filters, stat=stat)
+            results.append(result)
         
-        dashboard_data = {
-            'summary': {
-                'total_shorts': total_shorts,
-                'avg_views': format_number(avg_views),
-                'avg_likes': format_number(avg_likes),
-                'avg_comments': format_number(avg_comments),
-                'avg_words': round(avg_words, 2),
-                'avg_shorts_per_day': round(avg_shorts_per_day, 1),
-                'avg_views_raw': avg_views,
-                'avg_likes_raw': avg_likes,
-                'avg_comments_raw': avg_comments
-            },
-            'hashtag_stats': {
-                'usage_percentage': round(hashtag_usage_percentage, 1),
-                'non_usage_percentage': round(100 - hashtag_usage_percentage, 1),
-                'avg_hashtags_per_video': round(avg_hashtags_per_video, 1),
-                'avg_views_with': round(avg_views_with_hashtags, 1),
-                'avg_views_without': round(avg_views_without_hashtags, 1)
-            },
-            'emoji_stats': {
-                'usage_percentage': round(emoji_usage_percentage, 1),
-                'non_usage_percentage': round(100 - emoji_usage_percentage, 1),
-                'avg_emojis_per_video': round(avg_emojis_per_video, 1),
-                'avg_views_with': round(avg_views_with_emojis, 1),
-                'avg_views_without': round(avg_views_without_emojis, 1)
-            },
-            'sentiment_stats': sentiment_stats,
-            'videos_per_day': videos_per_day,
-            'time_success_data': time_success_data,
-            'time_buckets': time_buckets,
-            'heat_map_data': heat_map_data,
-            'top_shorts': top_shorts,
-            'scatter_data': scatter_data,
-            'time_series_data': time_series_data
-        }
+        shared = {}
+        if len(results) > 1:
+            for section in results[0]:
+                if section != 'filters' and all(result[section] == results[0][section] for result in results[1:]):
+                    shared[section] = results[0][section]
+            for result in results:
+                for section in shared:
+                    del result[section]
         
-        print(f"DEBUG: Returning dashboard data with {total_shorts} shorts")
-        return jsonify(dashboard_data)
+        print(f"DEBUG: Returning {len(results)} dashboard results, {len(shared)} shared sections")
+        return jsonify({'results': results, 'shared': shared})
         
     except Exception as e:
-        print(f"DEBUG: Error processing dashboard data: {str(e)}")
+        print(f"DEBUG: Error processing dashboard batch: {str(e)}")
         return jsonify({'error': f'Failed to process dashboard data: {str(e)}'}), 500
 
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_request_profiles():
+    """List recent request profiles captured with the X-Profile-Token header or profile query flag."""
+    if not request_profiler.admin_authorized():
+        return jsonify({'error': 'Profiling is disabled or the profile token is missing.'}), 403
+    return jsonify({'profiles': request_profiler.list_profiles()})
+
+@app.route('/api/admin/profiles/<request_id>', methods=['GET'])
+def get_request_profile(request_id):
+    """Download one capture in speedscope format."""
+    if not request_profiler.admin_authorized():
+        return jsonify({'error': 'Profiling is disabled or the profile token is missing.'}), 403
+    path = request_profiler.profile_path(request_id)
+    if path is None:
+        return jsonify({'error': 'Profile not found.'}), 404
+    return send_file(os.path.abspath(path), mimetype='application/json')
+
+# No-op unless REFRESH_QUOTA_PER_HOUR is set; every worker calls it and one becomes the leader
+refresh_scheduler.start(get_video_details, apply_refreshed_stats)
+
 if __name__ == '__main__':
     # Use production settings for Railway deployment
     port = int(os.environ.get('PORT', 5001))
@@ -12,6 +12,10 @@ echo "📁 Copying new bundle files..."
 cp -r dashboard/dist/assets/* static/dashboard/assets/
 cp dashboard/dist/index.html static/dashboard/
 
+echo "🗜️  Precompressing dashboard assets..."
+rm -f static/dashboard/assets/*.gz static/dashboard/assets/*.br static/dashboard/*.gz static/dashboard/*.br
+python precompress_assets.py static/dashboard
+
 echo "📝 Updating main index.html with predictable bundle references..."
 echo "JS Bundle: index.js"
 echo "CSS Bundle: index.css"
@@ -1,60 +1,41 @@
 #!/usr/bin/env python3
-import pandas as pd
 import sys
 
+from subscriber_csv import load_subscriber_csv
+
 def check_csv_format(csv_path):
     """Check if a CSV file has the correct format for generate_sub_peaks.py"""
     
-    try:
-        # Try to read the CSV
-        df = pd.read_csv(csv_path)
-        print(f"✅ Successfully read CSV file: {csv_path}")
-        print(f"📊 File has {len(df)} rows and {len(df.columns)} columns")
-        print(f"📋 Columns: {df.columns.tolist()}")
-        
-        # Check for required columns (first two columns)
-        if len(df.columns) < 2:
-            print(f"❌ Not enough columns. Need at least 2, got {len(df.columns)}")
+    upload = load_subscriber_csv(csv_path)
+    if upload.date_column is None:
+        print(f"❌ {upload.errors[0]['message']}")
+        if 'column' in upload.errors[0]['message']:
             print("💡 The CSV should have at least 2 columns: first for dates, second for metric values")
-            return False
-        
-        date_col = df.columns[0]
-        metric_col = df.columns[1]
-        
-        print(f"✅ Found columns: '{date_col}' (dates) and '{metric_col}' (metric values)")
-        
-        # Check data types
-        try:
-            df[date_col] = pd.to_datetime(df[date_col])
-            print(f"✅ Date column '{date_col}' can be parsed as datetime")
-        except Exception as e:
-            print(f"❌ Date column '{date_col}' cannot be parsed: {e}")
-            return False
-        
-        try:
-            df[metric_col] = pd.to_numeric(df[metric_col])
-            print(f"✅ Metric column '{metric_col}' can be parsed as numeric")
-        except Exception as e:
-            print(f"❌ Metric column '{metric_col}' cannot be parsed: {e}")
-            return False
-        
-        # Show sample data
-        print(f"\n📅 Sample data (first 5 rows):")
-        print(df[[date_col, metric_col]].head())
-        
-        # Check for any issues
-        if df[metric_col].isnull().any():
-            print(f"⚠️  Warning: Some {metric_col} values are null/missing")
-        
-        if df[date_col].isnull().any():
-            print(f"⚠️  Warning: Some {date_col} values are null/missing")
-        
-        print("\n✅ CSV format looks good for generate_sub_peaks.py!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error reading CSV file: {e}")
         return False
+    
+    print(f"✅ Successfully read CSV file: {csv_path}")
+    print(f"📊 File has {upload.total_rows} rows and {len(upload.columns)} columns")
+    print(f"📋 Columns: {upload.columns}")
+    print(f"✅ Found columns: '{upload.date_column}' (dates) and '{upload.metric_column}' (metric values)")
+    if upload.date_format:
+        print(f"✅ Date column '{upload.date_column}' parses with format {upload.date_format}")
+    
+    for error in upload.errors:
+        location = f"line {error['row']}" if error['row'] else 'file'
+        value = f" ({error['value']!r})" if error['value'] else ''
+        print(f"⚠️  {location}: {error['message']}{value}")
+    if upload.dropped_rows:
+        print(f"⚠️  Warning: {upload.dropped_rows} of {upload.total_rows} rows will be skipped")
+    
+    if upload.series is None:
+        return False
+    
+    # Show sample data
+    print(f"\n📅 Sample data (first 5 rows):")
+    print(upload.series.head())
+    
+    print("\n✅ CSV format looks good for generate_sub_peaks.py!")
+    return True
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
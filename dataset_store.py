@@ -0,0 +1,266 @@
+"""Memory-mapped storage for processed shorts datasets.
+
+Each channel's processed shorts are written once as an Arrow IPC file. Every
+gunicorn worker opens that file through a memory map, so the column buffers live
+in the OS page cache and are shared by all workers instead of each worker
+parsing and holding its own copy of the CSV.
+
+Next to each dataset sits a small ``<channel>.version`` file holding a
+generation counter. ``/api/analyze`` bumps it after atomically replacing the
+Arrow file; workers compare it on every request and remap when it changed, so
+new data is picked up without restarting or reloading the worker.
+
+Several writers can update the same channel (``/api/analyze`` in any worker,
+the background crawl and the refresh scheduler). A writer holds an exclusive
+per-channel file lock from its first sidecar write to the generation bump.
+Readers that need to map a new generation take the same lock shared, so a
+generation is always paired with its own Arrow file and sidecars.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import hashtag_index
+from quantile_sketch import build_daily_sketches
+
+DATASET_DIR = os.getenv('DATASET_DIR', os.path.join('data', 'datasets'))
+# Written by older versions of the app and by generate_mock_data.py
+LEGACY_CSV_PATH = os.getenv('LEGACY_DATASET_PATH', os.path.join('data', 'processed_shorts.csv'))
+CURRENT_FILE = 'current.json'
+
+_lock = threading.Lock()
+# channel_id -> (generation, pyarrow.Table backed by the memory map)
+_mapped = {}
+# (channel_id, sidecar name) -> (generation, parsed JSON)
+_sidecars = {}
+# channel_id -> (generation, DataFrame converted from the mapped table)
+_frames = {}
+_ARROW_BACKED_TYPES = {pa.string(): pd.ArrowDtype(pa.string())}
+
+
+def _dataset_path(channel_id):
+    return os.path.join(DATASET_DIR, f'{channel_id}.arrow')
+
+
+def _version_path(channel_id):
+    return os.path.join(DATASET_DIR, f'{channel_id}.version')
+
+
+@contextmanager
+def _channel_lock(channel_id, exclusive):
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    with open(os.path.join(DATASET_DIR, f'{channel_id}.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def current_channel():
+    """Return the channel ID of the most recently analyzed dataset, or None."""
+    current = _read_json(os.path.join(DATASET_DIR, CURRENT_FILE))
+    return current.get('channel_id') if current else None
+
+
+def list_channels():
+    """Return the IDs of all channels with a stored dataset."""
+    try:
+        names = os.listdir(DATASET_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len('.version')] for name in names if name.endswith('.version'))
+
+
+def read_version(channel_id=None):
+    """Return the version record ({'generation', 'rows', 'written_at', 'digest'}) of a dataset."""
+    channel_id = channel_id or current_channel()
+    if not channel_id:
+        return None
+    return _read_json(_version_path(channel_id))
+
+
+def dataset_version(channel_id=None):
+    """Return an opaque string that changes whenever the dataset is rewritten."""
+    channel_id = channel_id or current_channel()
+    version = read_version(channel_id)
+    if version:
+        return f"{channel_id}:{version['generation']}"
+    if os.path.exists(LEGACY_CSV_PATH):
+        stat = os.stat(LEGACY_CSV_PATH)
+        return f'legacy:{stat.st_mtime_ns}:{stat.st_size}'
+    return None
+
+
+def content_digest(df):
+    """Return a sha256 of a DataFrame's columns and values, independent of when it was written."""
+    digest = hashlib.sha256(json.dumps([str(column) for column in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _sidecar_path(channel_id, name):
+    return os.path.join(DATASET_DIR, f'{channel_id}.{name}.json')
+
+
+def dataset_sidecars(df):
+    """Build the structures stored next to a processed shorts dataset at ingest."""
+    return {
+        'sketches': build_daily_sketches(df),
+        'index': hashtag_index.build_index(df),
+    }
+
+
+def write_dataset(channel_id, df, sidecars=None, make_current=True, expected_generation=None):
+    """Persist a processed shorts DataFrame and bump its generation.
+
+    The Arrow file is written to a temporary name and renamed over the old one, so
+    workers that still map the previous generation keep reading a valid file until
+    they notice the new generation and remap. ``sidecars`` maps a name to a
+    JSON-serializable structure derived from the same data (e.g. quantile
+    sketches). Sidecars, Arrow file and version are replaced under the channel's
+    write lock, so concurrent writers get distinct generations and readers never
+    pair a generation with another generation's files. With
+    ``expected_generation``, nothing is written and None is returned unless that
+    is still the stored generation.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    digest = content_digest(df)
+    with _channel_lock(channel_id, exclusive=True):
+        previous = read_version(channel_id)
+        if expected_generation is not None and (previous or {}).get('generation') != expected_generation:
+            return None
+        for name, payload in (sidecars or {}).items():
+            _write_json_atomic(_sidecar_path(channel_id, name), payload)
+        fd, tmp_path = tempfile.mkstemp(dir=DATASET_DIR, suffix='.arrow.tmp')
+        os.close(fd)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, _dataset_path(channel_id))
+
+        version = {
+            'generation': (previous['generation'] + 1) if previous else 1,
+            'rows': table.num_rows,
+            'written_at': time.time(),
+            # Unlike the generation, equal for two writes of the same data
+            'digest': digest,
+        }
+        _write_json_atomic(_version_path(channel_id), version)
+    if make_current:
+        _write_json_atomic(os.path.join(DATASET_DIR, CURRENT_FILE), {'channel_id': channel_id})
+    print(f"DEBUG: Wrote dataset {channel_id} generation {version['generation']} ({table.num_rows} rows)")
+    return version
+
+
+def _cached(cache, key, generation):
+    cached = cache.get(key)
+    return cached is not None and cached[0] == generation
+
+
+def open_generation(channel_id=None, sidecars=()):
+    """Return (version, table, {name: sidecar}) all of one generation of a dataset.
+
+    Use this rather than separate open_dataset/read_sidecar calls whenever rows
+    of the table are combined with a sidecar (e.g. row IDs in the hashtag
+    index), since a write between two calls would pair different generations.
+    Returns (None, None, {}) if the channel has no dataset.
+    """
+    channel_id = channel_id or current_channel()
+    if not channel_id:
+        return None, None, {}
+    with _lock:
+        version = read_version(channel_id)
+        if not version:
+            return None, None, {}
+        keys = [(channel_id, name) for name in sidecars]
+        if not (_cached(_mapped, channel_id, version['generation'])
+                and all(_cached(_sidecars, key, version['generation']) for key in keys)):
+            with _channel_lock(channel_id, exclusive=False):
+                # Re-read: a writer may have finished while this reader waited for the lock
+                version = read_version(channel_id)
+                if not version:
+                    return None, None, {}
+                generation = version['generation']
+                if not _cached(_mapped, channel_id, generation):
+                    try:
+                        source = pa.memory_map(_dataset_path(channel_id), 'r')
+                    except FileNotFoundError:
+                        return None, None, {}
+                    _mapped[channel_id] = (generation, ipc.open_file(source).read_all())
+                    print(f"DEBUG: Mapped dataset {channel_id} generation {generation} in pid {os.getpid()}")
+                for key in keys:
+                    if not _cached(_sidecars, key, generation):
+                        _sidecars[key] = (generation, _read_json(_sidecar_path(channel_id, key[1])))
+        return version, _mapped[channel_id][1], {key[1]: _sidecars[key][1] for key in keys}
+
+
+def open_dataset(channel_id=None):
+    """Return the memory-mapped pyarrow Table for a dataset, remapping if it changed."""
+    return open_generation(channel_id)[1]
+
+
+def _to_frame(channel_id, version, table):
+    generation = version['generation']
+    with _lock:
+        if not _cached(_frames, channel_id, generation):
+            _frames[channel_id] = (generation, table.to_pandas(split_blocks=True,
+                                                               types_mapper=_ARROW_BACKED_TYPES.get))
+        return _frames[channel_id][1]
+
+
+def load_generation(channel_id=None, sidecars=()):
+    """Return (version, DataFrame, {name: sidecar}) of one generation, like load_frame and read_sidecar together.
+
+    For a legacy CSV dataset the version is None and every sidecar is None.
+    """
+    current = channel_id or current_channel()
+    version, table, payloads = open_generation(current, sidecars)
+    if table is not None:
+        return version, _to_frame(current, version, table), payloads
+    legacy = None
+    if channel_id is None and os.path.exists(LEGACY_CSV_PATH):
+        legacy = pd.read_csv(LEGACY_CSV_PATH)
+    return None, legacy, {name: None for name in sidecars}
+
+
+def load_frame(channel_id=None):
+    """Return a dataset as a DataFrame, or None if nothing has been analyzed yet.
+
+    Numeric columns without nulls are zero-copy views over the shared memory map
+    and string columns stay Arrow-backed, so no per-worker Python string objects
+    are created. The frame is converted once per generation and shared by every
+    request of the worker, so callers must not modify it (filter or copy it
+    first). Falls back to the legacy ``data/processed_shorts.csv`` when no Arrow
+    dataset exists.
+    """
+    return load_generation(channel_id)[1]
+
+
+def read_sidecar(name, channel_id=None):
+    """Return a sidecar structure written with the current generation, or None."""
+    return open_generation(channel_id, (name,))[2].get(name)
@@ -6,6 +6,7 @@ import random
 import emoji
 from textblob import TextBlob
 import re
+import dataset_store
 
 def generate_mock_processed_shorts():
     """Generate mock processed_shorts.csv with proper format and data"""
@@ -128,8 +129,9 @@ def generate_mock_processed_shorts():
     # Create DataFrame
     df = pd.DataFrame(data)
     
-    # Save to CSV
+    # Save to CSV and to the memory-mapped dataset served by the API
     df.to_csv('data/processed_shorts.csv', index=False)
+    dataset_store.write_dataset('mock', df, sidecars=dataset_store.dataset_sidecars(df))
     print(f"Generated {len(df)} mock Shorts records")
     print(f"Date range: {df['date'].min()} to {df['date'].max()}")
     print(f"Total views: {df['view_count'].sum():,}")
@@ -3,129 +3,98 @@ import pandas as pd
 from scipy.signal import find_peaks
 import sys
 
+from subscriber_csv import load_subscriber_csv
+
 # Usage: python generate_sub_peaks.py sub_day.csv output_sub_peaks.csv
 
-if len(sys.argv) != 3:
-    print("Usage: python generate_sub_peaks.py sub_day.csv output_sub_peaks.csv")
-    sys.exit(1)
+# Peak heights tried in order, in standard deviations above the mean
+THRESHOLD_STDS = [1, 0.5, 0.1]
+PEAK_DISTANCE = 2
 
-def find_date_column(df):
-    """Return the first column name (assumed to be date)"""
-    return [df.columns[0]]
+def read_subscriber_series(csv_source):
+    """Read a subscriber CSV (path or file-like object) into a date-indexed metric series.
 
-def find_metric_column(df):
-    """Return the second column name (assumed to be the metric values)"""
-    return [df.columns[1]]
+    Rows with an unparseable date or metric are dropped. Raises ValueError if
+    the file yields no usable series.
+    """
+    upload = load_subscriber_csv(csv_source)
+    for error in upload.errors:
+        location = f"line {error['row']}: " if error['row'] else ''
+        print(f"⚠️  {location}{error['message']}" + (f" ({error['value']!r})" if error['value'] else ''))
+    if upload.series is None:
+        raise ValueError(upload.errors[-1]['message'] if upload.errors else 'Could not read subscriber CSV')
+    
+    series = upload.series
+    print(f"Using date column: '{upload.date_column}' (format {upload.date_format or 'mixed'})")
+    print(f"Using metric column: '{upload.metric_column}'")
+    print(f"✅ Successfully processed {len(series)} data points")
+    print(f"Date range: {series.index.min()} to {series.index.max()}")
+    print(f"Metric range: {series.min():.0f} to {series.max():.0f}")
+    return series
 
-try:
-    # First try the exact expected format
-    try:
-        sub_day = pd.read_csv(sys.argv[1], parse_dates=["Date"]).sort_values("Date").set_index("Date")
-        series = sub_day["Subscribers"]
-        print("Successfully read with exact column names")
-    except Exception as e:
-        print(f"Could not read with exact column names: {e}")
-        
-        # Try to read the file and find the right columns
-        df = pd.read_csv(sys.argv[1])
-        print(f"Available columns: {df.columns.tolist()}")
-        
-        # Find date column
-        date_cols = find_date_column(df)
-        if not date_cols:
-            print("❌ No date column found. Looking for columns with 'date' or 'time' in the name.")
-            sys.exit(1)
-        
-        # Find metric column (second column)
-        metric_cols = find_metric_column(df)
-        if not metric_cols:
-            print("❌ No metric column found in second position.")
-            sys.exit(1)
-        
-        # Use the first matching columns
-        date_col = date_cols[0]
-        metric_col = metric_cols[0]
-        
-        print(f"Using date column: '{date_col}'")
-        print(f"Using metric column: '{metric_col}'")
-        
-        # Try to parse the date column
-        try:
-            df[date_col] = pd.to_datetime(df[date_col])
-        except Exception as e:
-            print(f"❌ Could not parse date column '{date_col}': {e}")
-            print("Make sure dates are in a recognizable format (YYYY-MM-DD, MM/DD/YYYY, etc.)")
-            sys.exit(1)
-        
-        # Try to parse the metric column
+def find_sub_peaks(series):
+    """Return the subscriber peaks of a series as a DataFrame with date and value columns.
+
+    The frame is empty when no peaks are found. Raises ValueError if the series is
+    too short or has no variation.
+    """
+    # Check if we have enough data
+    if len(series) < 5:
+        raise ValueError(f"Not enough data points. Need at least 5, got {len(series)}")
+    
+    # Check if we have any variation in the data
+    if series.std() == 0:
+        raise ValueError("No variation in metric data. Cannot detect peaks.")
+    
+    # Try to find peaks with different thresholds
+    thresholds = [series.mean() + stds * series.std() for stds in THRESHOLD_STDS]
+    
+    peaks = None
+    for threshold in thresholds:
         try:
-            df[metric_col] = pd.to_numeric(df[metric_col], errors='coerce')
-            # Remove rows with NaN values
-            df = df.dropna(subset=[metric_col])
+            peaks, props = find_peaks(series, height=threshold, distance=PEAK_DISTANCE)
+            if len(peaks) > 0:
+                print(f"Found {len(peaks)} peaks with threshold {threshold:.0f}")
+                break
         except Exception as e:
-            print(f"❌ Could not parse metric column '{metric_col}': {e}")
-            print("Make sure metric values are numeric")
-            sys.exit(1)
-        
-        # Sort by date and set as index
-        df = df.sort_values(date_col).set_index(date_col)
-        series = df[metric_col]
-        
-        print(f"✅ Successfully processed {len(series)} data points")
-        print(f"Date range: {series.index.min()} to {series.index.max()}")
-        print(f"Metric range: {series.min():.0f} to {series.max():.0f}")
-
-except Exception as e:
-    print(f"❌ Error reading input file: {e}")
-    try:
-        df = pd.read_csv(sys.argv[1])
-        print(f"File has {len(df)} rows and columns: {df.columns.tolist()}")
-    except Exception as e2:
-        print(f"Could not read file at all: {e2}")
-    sys.exit(1)
-
-# Check if we have enough data
-if len(series) < 5:
-    print(f"❌ Error: Not enough data points. Need at least 5, got {len(series)}")
-    sys.exit(1)
-
-# Check if we have any variation in the data
-if series.std() == 0:
-    print("❌ Error: No variation in metric data. Cannot detect peaks.")
-    sys.exit(1)
-
-# Try to find peaks with different thresholds
-thresholds = [
-    series.mean() + series.std(),  # Default threshold
-    series.mean() + 0.5 * series.std(),  # Lower threshold
-    series.mean() + 0.1 * series.std(),  # Much lower threshold
-]
-
-peaks = None
-for threshold in thresholds:
-    try:
-        peaks, props = find_peaks(series, height=threshold, distance=2)
-        if len(peaks) > 0:
-            print(f"Found {len(peaks)} peaks with threshold {threshold:.0f}")
-            break
-    except Exception as e:
-        print(f"Error with threshold {threshold}: {e}")
-        continue
-
-if peaks is None or len(peaks) == 0:
-    print("⚠️  Warning: No peaks found. This might mean:")
-    print("- The data doesn't have enough variation")
-    print("- The data is too short")
-    print("- The subscriber growth is too steady")
-    # Create an empty file
-    empty_df = pd.DataFrame(columns=["date", "value"])
-    empty_df.to_csv(sys.argv[2], index=False)
-    print("Created empty peaks file.")
-else:
-    peak_df = pd.DataFrame({
+            print(f"Error with threshold {threshold}: {e}")
+            continue
+    
+    if peaks is None or len(peaks) == 0:
+        print("⚠️  Warning: No peaks found. This might mean:")
+        print("- The data doesn't have enough variation")
+        print("- The data is too short")
+        print("- The subscriber growth is too steady")
+        return pd.DataFrame(columns=["date", "value"])
+    
+    return pd.DataFrame({
         "date": series.index[peaks],
         "value": series.values[peaks].round().astype(int)
     })
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python generate_sub_peaks.py sub_day.csv output_sub_peaks.csv")
+        sys.exit(1)
+    
+    try:
+        series = read_subscriber_series(sys.argv[1])
+    except Exception as e:
+        print(f"❌ Error reading input file: {e}")
+        sys.exit(1)
+    
+    try:
+        peak_df = find_sub_peaks(series)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    
     peak_df.to_csv(sys.argv[2], index=False)
-    print(f"✅ Found {len(peaks)} peaks and saved to {sys.argv[2]}")
-    print(f"Peak dates: {peak_df['date'].dt.strftime('%Y-%m-%d').tolist()}") 
\ No newline at end of file
+    if peak_df.empty:
+        print("Created empty peaks file.")
+    else:
+        print(f"✅ Found {len(peak_df)} peaks and saved to {sys.argv[2]}")
+        print(f"Peak dates: {peak_df['date'].dt.strftime('%Y-%m-%d').tolist()}")
+
+if __name__ == "__main__":
+    main()
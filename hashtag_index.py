@@ -0,0 +1,104 @@
+"""Inverted index from hashtags (and the dashboard filter values) to dataset rows.
+
+Built once at ingest by ``build_index`` and stored as a dataset sidecar. Row IDs
+are positions in the stored dataset, kept as sorted lists, so a query is a
+handful of sorted-array intersections plus a contiguous date slice instead of a
+regex scan over every title.
+"""
+import bisect
+import re
+
+import numpy as np
+
+HASHTAG = re.compile(r'#(\w+)')
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+def extract_hashtags(title):
+    """Return the distinct lower-cased hashtags of a title, in order of appearance."""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG.findall(title or '')))
+
+
+def _positions(mask):
+    return np.flatnonzero(np.asarray(mask, dtype=bool)).tolist()
+
+
+def build_index(df):
+    """Build the index for a processed shorts frame in its stored row order."""
+    hashtags = {}
+    for row, title in enumerate(df['title'].tolist()):
+        for tag in extract_hashtags(title):
+            hashtags.setdefault(tag, []).append(row)
+
+    dates = df['date'].astype(str).tolist()
+    dates_sorted = all(a <= b for a, b in zip(dates, dates[1:]))
+    date_runs = {'dates': [], 'starts': []}
+    if dates_sorted:
+        for row, date in enumerate(dates):
+            if not date_runs['dates'] or date_runs['dates'][-1] != date:
+                date_runs['dates'].append(date)
+                date_runs['starts'].append(row)
+
+    return {
+        'rows': len(df),
+        'hashtags': hashtags,
+        'has_hashtags': {'true': _positions(df['has_hashtags']), 'false': _positions(~df['has_hashtags'].astype(bool))},
+        'has_emojis': {'true': _positions(df['has_emojis']), 'false': _positions(~df['has_emojis'].astype(bool))},
+        'sentiment': {value: _positions(df['sentiment'] == value) for value in SENTIMENTS},
+        # Only usable when the dataset is stored in date order, which /api/analyze guarantees
+        'date_runs': date_runs if dates_sorted else None,
+        'dates': None if dates_sorted else dates,
+    }
+
+
+def _date_rows(index, start_date, end_date):
+    if index['date_runs'] is not None:
+        runs = index['date_runs']
+        lo = bisect.bisect_left(runs['dates'], start_date)
+        hi = bisect.bisect_right(runs['dates'], end_date)
+        first = runs['starts'][lo] if lo < len(runs['starts']) else index['rows']
+        last = runs['starts'][hi] if hi < len(runs['starts']) else index['rows']
+        return np.arange(first, last)
+    dates = np.asarray(index['dates'])
+    return np.flatnonzero((dates >= start_date) & (dates <= end_date))
+
+
+def filter_rows(index, filters):
+    """Return the sorted row IDs matching dashboard filters (see app.parse_dashboard_filters)."""
+    rows = None
+    if filters['start_date'] and filters['end_date']:
+        rows = _date_rows(index, filters['start_date'], filters['end_date'])
+    for key, posting_key in (('hashtag_filter', 'has_hashtags'), ('emoji_filter', 'has_emojis'),
+                             ('sentiment_filter', 'sentiment')):
+        value = filters[key]
+        if value is None:
+            continue
+        posting = np.asarray(index[posting_key].get(value, []), dtype=np.int64)
+        rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+    return rows
+
+
+def hashtag_stats(index, views, engagement, rows=None, min_count=1):
+    """Return per-hashtag count and mean/median views and engagement rate, most used first.
+
+    views and engagement are the dataset's view_count and engagement_rate arrays;
+    rows restricts the result to those row IDs (None for all rows).
+    """
+    results = []
+    for tag, posting in index['hashtags'].items():
+        tag_rows = np.asarray(posting, dtype=np.int64)
+        if rows is not None:
+            tag_rows = np.intersect1d(tag_rows, rows, assume_unique=True)
+        if len(tag_rows) < min_count or len(tag_rows) == 0:
+            continue
+        tag_views = views[tag_rows]
+        tag_engagement = engagement[tag_rows]
+        results.append({
+            'hashtag': f'#{tag}',
+            'count': int(len(tag_rows)),
+            'mean_views': float(tag_views.mean()),
+            'median_views': float(np.median(tag_views)),
+            'mean_engagement_rate': float(np.nanmean(tag_engagement)),
+            'median_engagement_rate': float(np.nanmedian(tag_engagement)),
+        })
+    return sorted(results, key=lambda result: (-result['count'], -result['mean_views'], result['hashtag']))
@@ -0,0 +1,113 @@
+"""HTTP caching helpers for dashboard assets and the data endpoints.
+
+Static files get an ETag derived from their content hash and, when the client
+accepts it, a precompressed ``.br`` or ``.gz`` sibling written by
+precompress_assets.py, unless the sibling is older than the file. Data endpoints get an ETag derived from the dataset
+version and the query string, so a dashboard that has not changed since the
+last request is answered with 304 Not Modified without recomputing anything.
+"""
+import functools
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import abort, current_app, make_response, request, send_file
+from werkzeug.security import safe_join
+
+import dataset_store
+
+# Bundle names are fixed (index.js/index.css), so browsers revalidate by default;
+# the ETag turns that revalidation into a cheap 304.
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '0'))
+# Encodings in order of preference, mapped to the suffix of the precompressed file
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+MIN_GZIP_BYTES = 1024
+
+_hash_lock = threading.Lock()
+# path -> (mtime_ns, size, sha256 hex)
+_content_hashes = {}
+
+
+def content_hash(path):
+    """Return the sha256 of a file, cached until its mtime or size changes."""
+    stat = os.stat(path)
+    with _hash_lock:
+        cached = _content_hashes.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    with _hash_lock:
+        _content_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def send_static_cached(directory, path):
+    """Serve a static file with a content-hash ETag, preferring a precompressed variant."""
+    # Relative to the app like send_from_directory, not to the process's working directory
+    full_path = safe_join(os.path.join(current_app.root_path, directory), path)
+    if full_path is None or not os.path.isfile(full_path):
+        abort(404)
+    mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    served_path, encoding = full_path, None
+    source_mtime = os.stat(full_path).st_mtime_ns
+    for candidate, suffix in PRECOMPRESSED:
+        if not request.accept_encodings[candidate]:
+            continue
+        try:
+            # A variant older than its source is left over from a previous build
+            if os.stat(full_path + suffix).st_mtime_ns >= source_mtime:
+                served_path, encoding = full_path + suffix, candidate
+                break
+        except FileNotFoundError:
+            continue
+
+    etag = content_hash(served_path)[:32] + (f'-{encoding}' if encoding else '')
+    response = send_file(served_path, mimetype=mimetype, etag=etag, conditional=True, max_age=STATIC_MAX_AGE,
+                         download_name=os.path.basename(full_path))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, must-revalidate'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def dataset_etag():
+    """Return the ETag for the current request's view of the dataset, or None if there is no dataset."""
+    version = dataset_store.dataset_version()
+    if version is None:
+        return None
+    query = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    return hashlib.sha256(f'{version}|{request.path}|{query}'.encode()).hexdigest()[:32]
+
+
+def cached_by_dataset(view):
+    """Decorate a GET data endpoint with dataset-version ETags, 304 responses and gzip."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = dataset_etag()
+        # Weak, because the same ETag covers the identity and gzip encodings of the body
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if request.accept_encodings['gzip'] and len(body) >= MIN_GZIP_BYTES:
+            response.set_data(gzip.compress(body, compresslevel=6))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+    return wrapper
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Local stand-in for the parts of the YouTube Data API v3 used by app.py.
+
+Serves ``/channels``, ``/playlistItems`` and ``/videos`` for a set of synthetic
+channels so the app can be load-tested without calling googleapis.com. Point the
+app at it with ``YOUTUBE_API_BASE=http://127.0.0.1:<port>``.
+
+Channels are deterministic: channel ``i`` has ID ``channel_id(i)`` and
+``--videos`` uploads spread over ``--start``..``--end``, newest first, with a mix
+of Shorts and longer videos. ``--latency-ms`` delays every response to mimic the
+real API's round trip.
+
+Usage: python loadtest/fake_youtube_api.py [--port 8765] [--channels 3] [--videos 2000] [--latency-ms 80]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 50
+WORDS = ['amazing', 'cat', 'dog', 'recipe', 'fail', 'best', 'worst', 'day', 'vlog', 'trick',
+         'happy', 'sad', 'quick', 'easy', 'hack', 'challenge', 'funny', 'new', 'terrible', 'love']
+EMOJIS = ['🔥', '😂', '😍', '🎉', '']
+
+
+def channel_id(index):
+    """Return the synthetic channel ID for an index (UC + 22 characters, like real IDs)."""
+    return f'UCfake{index:018d}'
+
+
+def uploads_playlist_id(index):
+    return f'UUfake{index:018d}'
+
+
+def build_channel(index, num_videos, start, end):
+    """Return the channel's videos, newest first, as dicts with snippet and statistics fields."""
+    rng = random.Random(index)
+    span = int((end - start).total_seconds())
+    videos = []
+    for i in range(num_videos):
+        published = start + timedelta(seconds=rng.randrange(span))
+        title = ' '.join(rng.choices(WORDS, k=rng.randint(2, 7))) + rng.choice(EMOJIS)
+        if rng.random() < 0.5:
+            title += ' ' + ' '.join(f'#{rng.choice(WORDS)}' for _ in range(rng.randint(1, 3)))
+        seconds = rng.randint(5, 60) if rng.random() < 0.85 else rng.randint(61, 1800)
+        duration = f'PT{seconds // 60}M{seconds % 60}S' if seconds >= 60 else f'PT{seconds}S'
+        views = int(rng.lognormvariate(8, 1.8))
+        videos.append({
+            'id': f'{index:03d}v{i:07d}',
+            'title': title,
+            'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'duration': duration,
+            'viewCount': views,
+            'likeCount': int(views * rng.uniform(0.01, 0.06)),
+            'commentCount': int(views * rng.uniform(0.0005, 0.005)),
+        })
+    videos.sort(key=lambda video: video['publishedAt'], reverse=True)
+    return videos
+
+
+class FakeYouTubeAPI:
+    def __init__(self, num_channels, num_videos, latency_ms, start, end):
+        self.num_channels = num_channels
+        self.num_videos = num_videos
+        self.latency = latency_ms / 1000
+        self.start = start
+        self.end = end
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.request_counts = {}
+
+    def videos_for(self, index):
+        with self._lock:
+            if index not in self._channels:
+                videos = build_channel(index, self.num_videos, self.start, self.end)
+                self._channels[index] = (videos, {video['id']: video for video in videos})
+            return self._channels[index]
+
+    def _index_from(self, value, prefix):
+        if not value or not value.startswith(prefix):
+            return None
+        try:
+            index = int(value[len(prefix):])
+        except ValueError:
+            return None
+        return index if index < self.num_channels else None
+
+    def handle(self, endpoint, params):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+        if endpoint == 'channels':
+            index = self._index_from(params.get('id'), 'UCfake')
+            if index is None:
+                return {'items': []}
+            return {'items': [{
+                'id': params['id'],
+                'contentDetails': {'relatedPlaylists': {'uploads': uploads_playlist_id(index)}},
+                'statistics': {'videoCount': str(self.num_videos)},
+            }]}
+        if endpoint == 'playlistItems':
+            index = self._index_from(params.get('playlistId'), 'UUfake')
+            if index is None:
+                return None
+            videos, _ = self.videos_for(index)
+            offset = int(params.get('pageToken', 0))
+            page = videos[offset:offset + PAGE_SIZE]
+            payload = {'items': [{
+                'contentDetails': {'videoId': video['id']},
+                'snippet': {'title': video['title'], 'publishedAt': video['publishedAt']},
+            } for video in page]}
+            if offset + PAGE_SIZE < len(videos):
+                payload['nextPageToken'] = str(offset + PAGE_SIZE)
+            return payload
+        if endpoint == 'videos':
+            items = []
+            for video_id in params.get('id', '').split(',')[:PAGE_SIZE]:
+                try:
+                    index = int(video_id.split('v', 1)[0])
+                except ValueError:
+                    continue
+                if index >= self.num_channels:
+                    continue
+                video = self.videos_for(index)[1].get(video_id)
+                if video:
+                    items.append({
+                        'id': video_id,
+                        'contentDetails': {'duration': video['duration']},
+                        'statistics': {
+                            'viewCount': str(video['viewCount']),
+                            'likeCount': str(video['likeCount']),
+                            'commentCount': str(video['commentCount']),
+                        },
+                    })
+            return {'items': items}
+        return None
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+            if api.latency:
+                time.sleep(api.latency)
+            if endpoint == 'stats':
+                payload = api.request_counts
+            else:
+                payload = api.handle(endpoint, params)
+            status = 200 if payload is not None else 404
+            body = json.dumps(payload if payload is not None else {'error': {'code': 404}}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake YouTube Data API for load testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--videos', type=int, default=2000, help='uploads per channel')
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--start', default='2022-06-01', help='earliest publish date')
+    parser.add_argument('--end', default='2025-07-04', help='latest publish date')
+    args = parser.parse_args()
+
+    api = FakeYouTubeAPI(args.channels, args.videos, args.latency_ms,
+                         datetime.fromisoformat(args.start), datetime.fromisoformat(args.end))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(api))
+    server.daemon_threads = True
+    print(f"Fake YouTube API on http://{args.host}:{args.port} "
+          f"({args.channels} channels x {args.videos} videos, {args.latency_ms:.0f}ms latency)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
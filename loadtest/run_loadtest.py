@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""End-to-end load test for /api/analyze and /api/dashboard_data.
+
+Starts the fake YouTube API (fake_youtube_api.py) and the app under gunicorn
+with the command from the Procfile, analyzes every synthetic channel once so
+the dashboard has data, then drives mixed traffic at fixed target rates for
+``--duration`` seconds. Requests are issued open-loop: latency is measured from
+the moment a request was due, so a saturated server shows up as growing latency
+instead of a silently lower request rate.
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint. Use
+``--save-baseline NAME`` to store the results under loadtest/baselines/ and
+``--compare NAME`` to check a run against a stored baseline (exit status 1 on
+regression).
+
+Usage: python loadtest/run_loadtest.py [--duration 30] [--analyze-rps 0.2] [--dashboard-rps 5]
+                                       [--videos 2000] [--latency-ms 80] [--compare default]
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from fake_youtube_api import channel_id
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(LOADTEST_DIR)
+BASELINE_DIR = os.path.join(LOADTEST_DIR, 'baselines')
+# Environment variables of every directory the app writes to, and their names under the run's tmpdir
+STATE_DIRS = {
+    'DATASET_DIR': 'datasets',
+    'PERCENTILE_DIR': 'percentiles',
+    'SNAPSHOT_DIR': 'snapshots',
+    'TITLE_SIGNATURE_DIR': 'title_signatures',
+    'RESULT_CACHE_DIR': 'result_cache',
+    'SECTION_CACHE_DIR': 'section_cache',
+    'REFRESH_DIR': 'refresh',
+    'PROFILE_DIR': 'profiles',
+}
+DASHBOARD_QUERIES = [
+    {},
+    {'start_date': '2024-01-01', 'end_date': '2024-12-31'},
+    {'start_date': '2023-06-01', 'end_date': '2023-08-31', 'hashtag_filter': 'true'},
+    {'emoji_filter': 'false'},
+    {'sentiment_filter': 'positive'},
+    {'stat': 'median'},
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def procfile_command(port):
+    """Return the Procfile's web command with $PORT filled in, run through this interpreter."""
+    with open(os.path.join(REPO_DIR, 'Procfile')) as f:
+        web = next(line.split(':', 1)[1] for line in f if line.startswith('web:'))
+    command = shlex.split(web.replace('$PORT', str(port)))
+    if command[0] == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn'] + command[1:]
+    return command
+
+
+def wait_for(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not come up within {timeout}s')
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((latency, ok))
+
+    def summary(self, duration):
+        results = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            latencies = np.array([latency for latency, _ in samples]) * 1000
+            errors = sum(1 for _, ok in samples if not ok)
+            results[endpoint] = {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / duration, 3),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+                'p99_ms': round(float(np.percentile(latencies, 99)), 1),
+                'error_rate': round(errors / len(samples), 4),
+            }
+        return results
+
+
+def analyze_request(base_url, channel, csv_bytes):
+    files = {'csvFile': ('upload.csv', csv_bytes, 'text/csv')} if csv_bytes else None
+    return requests.post(f'{base_url}/api/analyze', data={'channelId': channel}, files=files, timeout=600)
+
+
+def dashboard_request(base_url, params):
+    return requests.get(f'{base_url}/api/dashboard_data', params=params, timeout=120)
+
+
+def drive(rate, duration, pool, recorder, endpoint, make_request):
+    """Submit make_request at a fixed rate, timing each from its scheduled start."""
+    if rate <= 0:
+        return
+    interval = 1 / rate
+    start = time.perf_counter()
+    due = start
+
+    def run(scheduled):
+        try:
+            ok = make_request().status_code < 400
+        except requests.RequestException:
+            ok = False
+        recorder.record(endpoint, time.perf_counter() - scheduled, ok)
+
+    while due < start + duration:
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(run, due)
+        due += interval
+
+
+def print_results(results):
+    print(f"\n{'endpoint':<26} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<26} {r['requests']:>6} {r['throughput_rps']:>8.2f} {r['p50_ms']:>9.1f} "
+              f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['error_rate']:>7.1%}")
+
+
+def compare(results, config, baseline, tolerance):
+    """Print the change against a baseline; return True if any endpoint regressed."""
+    regressed = False
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    differing = [key for key, value in config.items() if key != 'tolerance' and baseline['config'].get(key) != value]
+    if differing:
+        print(f"  note: baseline was recorded with different settings for {', '.join(differing)}")
+    for endpoint, current in results.items():
+        previous = baseline['results'].get(endpoint)
+        if not previous:
+            print(f"  {endpoint}: no baseline")
+            continue
+        problems = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                problems.append(f"{metric} {previous[metric]:.1f} -> {current[metric]:.1f}")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            problems.append(f"throughput {previous['throughput_rps']:.2f} -> {current['throughput_rps']:.2f}")
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            problems.append(f"error rate {previous['error_rate']:.1%} -> {current['error_rate']:.1%}")
+        regressed = regressed or bool(problems)
+        print(f"  {endpoint}: {'REGRESSED: ' + '; '.join(problems) if problems else 'ok'}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured traffic')
+    parser.add_argument('--analyze-rps', type=float, default=0.2)
+    parser.add_argument('--dashboard-rps', type=float, default=5)
+    parser.add_argument('--channels', type=int, default=3)
+    parser.add_argument('--videos', type=int, default=2000, help='uploads per synthetic channel')
+    parser.add_argument('--latency-ms', type=float, default=80, help='fake API latency per call')
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--csv', default=os.path.join(REPO_DIR, 'data', 'mock_user_upload.csv'),
+                        help="subscriber CSV uploaded with analyze requests ('' for channel-only)")
+    parser.add_argument('--gunicorn-args', default='', help='extra arguments appended to the Procfile command')
+    parser.add_argument('--save-baseline', metavar='NAME')
+    parser.add_argument('--compare', metavar='NAME')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    csv_bytes = open(args.csv, 'rb').read() if args.csv else None
+    channels = [channel_id(i) for i in range(args.channels)]
+    api_port, app_port = free_port(), free_port()
+    base_url = f'http://127.0.0.1:{app_port}'
+    processes = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(LOADTEST_DIR, 'fake_youtube_api.py'), '--port', str(api_port),
+                 '--channels', str(args.channels), '--videos', str(args.videos),
+                 '--latency-ms', str(args.latency_ms)]))
+            wait_for(f'http://127.0.0.1:{api_port}/stats')
+
+            env = dict(os.environ, PORT=str(app_port), API_KEY='loadtest',
+                       YOUTUBE_API_BASE=f'http://127.0.0.1:{api_port}',
+                       # Keep the synthetic channels out of the real stores (e.g. the cross-channel percentile index)
+                       **{name: os.path.join(tmpdir, subdir) for name, subdir in STATE_DIRS.items()})
+            command = procfile_command(app_port) + shlex.split(args.gunicorn_args)
+            print(f"Starting app: {' '.join(command)}")
+            processes.append(subprocess.Popen(command, cwd=REPO_DIR, env=env,
+                                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            wait_for(f'{base_url}/test')
+
+            print(f"Warming up: analyzing {len(channels)} channels of {args.videos} videos")
+            for channel in channels:
+                response = analyze_request(base_url, channel, csv_bytes)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'Warm-up analyze failed for {channel}: {response.text[:200]}')
+
+            print(f"Driving {args.analyze_rps} analyze/s and {args.dashboard_rps} dashboard/s for {args.duration:.0f}s")
+            recorder = Recorder()
+            rng = random.Random(0)
+            with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+                drivers = [
+                    threading.Thread(target=drive, args=(
+                        args.analyze_rps, args.duration, pool, recorder, 'POST /api/analyze',
+                        lambda: analyze_request(base_url, rng.choice(channels), csv_bytes))),
+                    threading.Thread(target=drive, args=(
+                        args.dashboard_rps, args.duration, pool, recorder, 'GET /api/dashboard_data',
+                        lambda: dashboard_request(base_url, rng.choice(DASHBOARD_QUERIES)))),
+                ]
+                started = time.perf_counter()
+                for driver in drivers:
+                    driver.start()
+                for driver in drivers:
+                    driver.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=30)
+
+    results = recorder.summary(elapsed)
+    print_results(results)
+    run = {
+        'config': dict({key: value for key, value in vars(args).items() if key not in ('save_baseline', 'compare')},
+                       csv=os.path.relpath(args.csv, REPO_DIR) if args.csv else ''),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f'{args.save_baseline}.json')
+        with open(path, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        if compare(results, run['config'], baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
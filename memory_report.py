@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Report per-worker memory for the dashboard endpoints under gunicorn.
+
+Boots the app twice with the same synthetic dataset: once serving the legacy
+``processed_shorts.csv`` (every request parses its own copy) and once serving the
+memory-mapped Arrow dataset. For each run it prints RSS and PSS of every worker
+before and after a burst of ``/api/dashboard_data`` requests. PSS splits shared
+pages between the processes mapping them, so it shows the saving from the
+shared Arrow file that plain RSS hides.
+
+Usage: python memory_report.py [--rows 20000] [--workers 4] [--requests 40]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+import dataset_store
+
+
+def build_synthetic_dataset(rows, seed=42):
+    """Build a processed shorts frame with the columns written by /api/analyze."""
+    rng = np.random.default_rng(seed)
+    published = pd.Timestamp('2022-06-01', tz='UTC') + pd.to_timedelta(
+        rng.integers(0, 3 * 365 * 24 * 3600, rows), unit='s')
+    published = published.sort_values()
+    views = rng.lognormal(9, 1.5, rows).astype(int)
+    likes = (views * rng.uniform(0.01, 0.05, rows)).astype(int)
+    comments = (views * rng.uniform(0.001, 0.005, rows)).astype(int)
+    hashtags = rng.integers(0, 4, rows)
+    titles = [f'Synthetic short {i} ' + ' '.join(f'#tag{(i + k) % 50}' for k in range(n))
+              for i, n in enumerate(hashtags)]
+    polarity = rng.uniform(-1, 1, rows).round(3)
+    return pd.DataFrame({
+        'video_id': [f'vid{i:08d}' for i in range(rows)],
+        'title': titles,
+        'published_at': published.astype(str),
+        'date': published.date.astype(str),
+        'time': published.time.astype(str),
+        'hour': published.hour,
+        'duration_seconds': rng.integers(5, 61, rows).astype(float),
+        'view_count': views,
+        'like_count': likes,
+        'comment_count': comments,
+        'engagement_rate': (comments * 0.7842535737762139 + likes * 0.21574642622378612) / np.maximum(views, 1),
+        'has_hashtags': hashtags > 0,
+        'hashtag_count': hashtags,
+        'has_emojis': rng.random(rows) < 0.3,
+        'emoji_count': rng.integers(0, 3, rows),
+        'clean_title': [f'Synthetic short {i}' for i in range(rows)],
+        'num_words': 3 + hashtags,
+        'sentiment_polarity': polarity,
+        'sentiment': np.where(polarity > 0, 'positive', np.where(polarity < 0, 'negative', 'neutral')),
+        'day_of_week': published.day_name(),
+    })
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def worker_pids(master_pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def memory_kb(pid):
+    """Return (rss_kb, pss_kb) for a process from /proc."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def snapshot(master_pid):
+    return {pid: memory_kb(pid) for pid in worker_pids(master_pid)}
+
+
+def run_mode(label, env, workers, num_requests):
+    port = free_port()
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'app:app'],
+        cwd=script_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f'{base_url}/test', timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.2)
+        while len(worker_pids(server.pid)) < workers:
+            time.sleep(0.2)
+        before = snapshot(server.pid)
+        with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+            statuses = list(pool.map(
+                lambda _: requests.get(f'{base_url}/api/dashboard_data', timeout=120).status_code,
+                range(num_requests)))
+        after = snapshot(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    print(f"\n== {label} ({num_requests} requests, statuses {sorted(set(statuses))}) ==")
+    print(f"{'pid':>8} {'RSS before':>12} {'RSS after':>12} {'PSS before':>12} {'PSS after':>12}")
+    for pid in sorted(after):
+        rss_before, pss_before = before.get(pid, (0, 0))
+        rss_after, pss_after = after[pid]
+        print(f"{pid:>8} {rss_before / 1024:>10.1f}MB {rss_after / 1024:>10.1f}MB "
+              f"{pss_before / 1024:>10.1f}MB {pss_after / 1024:>10.1f}MB")
+    total_pss = sum(pss for _, pss in after.values())
+    print(f"Total worker PSS after: {total_pss / 1024:.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=40)
+    args = parser.parse_args()
+
+    df = build_synthetic_dataset(args.rows)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, 'processed_shorts.csv')
+        df.to_csv(csv_path, index=False)
+        empty_dir = os.path.join(tmpdir, 'empty')
+        arrow_dir = os.path.join(tmpdir, 'datasets')
+        os.makedirs(empty_dir)
+        dataset_store.DATASET_DIR = arrow_dir
+        dataset_store.write_dataset('synthetic', df, sidecars=dataset_store.dataset_sidecars(df))
+
+        base_env = dict(os.environ, LEGACY_DATASET_PATH=csv_path)
+        run_mode('legacy CSV per request', dict(base_env, DATASET_DIR=empty_dir), args.workers, args.requests)
+        run_mode('shared memory-mapped Arrow', dict(base_env, DATASET_DIR=arrow_dir), args.workers, args.requests)
+
+
+if __name__ == '__main__':
+    main()
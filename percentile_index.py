@@ -0,0 +1,154 @@
+"""Cross-channel percentile ranks for per-video metrics.
+
+Every analyzed channel contributes its videos' views, engagement rate, duration
+and publish hour. The index keeps one sorted array per metric holding the values
+of all channels, so a percentile rank is two binary searches (O(log n)) however
+many channels have been analyzed.
+
+Each channel's own sorted values are stored in the same file as the global
+arrays. When a channel is re-analyzed, its previous values are removed from the
+global arrays and the new ones are merged in. The rest of the index is not
+rebuilt. Updates from concurrent gunicorn workers are serialized with a file
+lock.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+PERCENTILE_DIR = os.getenv('PERCENTILE_DIR', os.path.join('data', 'percentiles'))
+INDEX_FILE = 'index.npz'
+# Public metric name -> processed shorts column
+METRICS = {
+    'views': 'view_count',
+    'engagement_rate': 'engagement_rate',
+    'duration': 'duration_seconds',
+    'hour': 'hour',
+}
+
+_lock = threading.Lock()
+# (mtime_ns, size) of the index file and the loaded index
+_loaded = (None, None)
+
+
+def _index_path():
+    return os.path.join(PERCENTILE_DIR, INDEX_FILE)
+
+
+def _channel_key(metric, channel_id):
+    return f'{metric}@{channel_id}'
+
+
+def _save_npz(path, arrays):
+    fd, tmp_path = tempfile.mkstemp(dir=PERCENTILE_DIR, suffix='.npz.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load_npz(path):
+    try:
+        with np.load(path) as stored:
+            return {name: stored[name] for name in stored.files}
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _update_lock():
+    os.makedirs(PERCENTILE_DIR, exist_ok=True)
+    with open(os.path.join(PERCENTILE_DIR, 'index.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _sorted_values(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.sort(values[np.isfinite(values)])
+
+
+def _remove_sorted(values, removed):
+    """Remove each element of sorted ``removed`` once from sorted ``values``."""
+    if len(removed) == 0:
+        return values
+    # The k-th copy of a repeated value maps to the k-th matching slot in values
+    occurrence = np.arange(len(removed)) - np.searchsorted(removed, removed, side='left')
+    positions = np.searchsorted(values, removed, side='left') + occurrence
+    keep = np.ones(len(values), dtype=bool)
+    keep[positions[positions < len(values)]] = False
+    return values[keep]
+
+
+def _insert_sorted(values, added):
+    """Merge sorted ``added`` into sorted ``values``."""
+    return np.insert(values, np.searchsorted(values, added, side='right'), added)
+
+
+def update_channel(channel_id, df):
+    """Replace a channel's contribution with the metrics of a processed shorts frame."""
+    contribution = {metric: _sorted_values(df[column]) for metric, column in METRICS.items()}
+    with _update_lock():
+        index = _load_npz(_index_path()) or {}
+        channels = set(json.loads(str(index.pop('channels')))) if 'channels' in index else set()
+        for metric, values in contribution.items():
+            current = index.get(metric, np.empty(0))
+            current = _remove_sorted(current, index.get(_channel_key(metric, channel_id), np.empty(0)))
+            index[metric] = _insert_sorted(current, values)
+            index[_channel_key(metric, channel_id)] = values
+        channels.add(channel_id)
+        # One file, so the global arrays and per-channel values are always replaced together
+        _save_npz(_index_path(), dict(index, channels=np.array(json.dumps(sorted(channels)))))
+        total = len(index['views'])
+    print(f"DEBUG: Percentile index now holds {total} videos from {len(channels)} channels")
+
+
+def load_index():
+    """Return the global index ({metric: sorted array, 'channels': [...]}), or None if empty."""
+    global _loaded
+    try:
+        stat = os.stat(_index_path())
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _loaded[0] == key:
+            return _loaded[1]
+        try:
+            # Only the global arrays; the per-channel copies are needed by updates alone
+            with np.load(_index_path()) as stored:
+                index = {metric: stored[metric] for metric in METRICS}
+                index['channels'] = json.loads(str(stored['channels']))
+        except (OSError, ValueError, KeyError):
+            return None
+        _loaded = (key, index)
+        return index
+
+
+def percentile_rank(sorted_values, value):
+    """Return the percentage of values below ``value``, counting ties as half (0-100)."""
+    if len(sorted_values) == 0 or value is None:
+        return None
+    below = np.searchsorted(sorted_values, value, side='left')
+    at_or_below = np.searchsorted(sorted_values, value, side='right')
+    return float((below + at_or_below) / 2 / len(sorted_values) * 100)
+
+
+def rank_metrics(values, index=None):
+    """Return {metric: {'value', 'percentile'}} for the given metric values."""
+    index = index if index is not None else load_index()
+    if index is None:
+        return None
+    ranks = {}
+    for metric, value in values.items():
+        if metric not in METRICS:
+            continue
+        value = None if value is None or not np.isfinite(float(value)) else float(value)
+        ranks[metric] = {'value': value, 'percentile': percentile_rank(index[metric], value)}
+    return ranks
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Write .gz (and .br, when the brotli package is installed) copies of dashboard assets.
+
+app.py serves these precompressed files to clients that accept the encoding.
+Run after building the dashboard; build_dashboard.sh does this automatically.
+
+Usage: python precompress_assets.py [static/dashboard]
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.js', '.css', '.html', '.svg', '.json', '.map', '.txt')
+
+def precompress(directory):
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                # Only keep variants that are actually smaller
+                if len(compressed) < len(data):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+                elif os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    return written
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join('static', 'dashboard')
+    count = precompress(directory)
+    print(f"✅ Wrote {count} precompressed files under {directory}" + ("" if brotli else " (gzip only, brotli not installed)"))
@@ -0,0 +1,146 @@
+"""Mergeable quantile sketches for the dashboard heat map and time buckets.
+
+Sums and means per (hour, day) cell are dominated by a few viral Shorts, but
+computing exact medians for every requested date range means re-scanning the
+data. Instead, ``build_daily_sketches`` summarizes each (date, hour) at ingest
+with a KLL sketch, and a date range is answered by merging the daily sketches
+of that range. Days typically hold only a handful of Shorts, so most daily
+sketches are still exact; merged ones keep a rank error of roughly 1/k.
+"""
+import math
+import random
+from collections import defaultdict
+
+import numpy as np
+
+SKETCH_METRICS = {'views': 'view_count', 'likes': 'like_count', 'comments': 'comment_count'}
+DEFAULT_K = 200
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty 2016) over numeric values."""
+
+    def __init__(self, k=DEFAULT_K, compactors=None):
+        self.k = k
+        self.compactors = compactors or [[]]
+        self._rng = random.Random(sum(len(c) for c in self.compactors))
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def count(self):
+        return sum(len(c) << level for level, c in enumerate(self.compactors))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        if self.size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        while self.size() >= self._max_size():
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 >= len(self.compactors):
+                        self.compactors.append([])
+                    compactor.sort()
+                    # Keep an odd item at this level so the compaction is exact in weight
+                    carry = [compactor.pop()] if len(compactor) % 2 else []
+                    self.compactors[level + 1].extend(compactor[self._rng.randint(0, 1)::2])
+                    self.compactors[level] = carry
+                    break
+            else:
+                return
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return the smallest stored value whose cumulative weight reaches q of the total."""
+        weighted = sorted((value, 1 << level) for level, c in enumerate(self.compactors) for value in c)
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_list(self):
+        return self.compactors
+
+    @classmethod
+    def from_list(cls, compactors, k=DEFAULT_K):
+        return cls(k, [list(c) for c in compactors])
+
+
+def exact_quantile(values, q):
+    """Quantile with the same definition the sketch uses, for filtered requests."""
+    values = np.asarray(values)
+    if len(values) == 0:
+        return None
+    return np.quantile(values, q, method='inverted_cdf').item()
+
+
+def build_daily_sketches(df, k=DEFAULT_K):
+    """Summarize each (date, hour) of a processed shorts frame for every sketch metric.
+
+    Returns a JSON-serializable dict {'k', 'days': {date: {hour: {metric: compactors}}}}.
+    """
+    days = defaultdict(dict)
+    for (date, hour), group in df.groupby([df['date'].astype(str), 'hour'], sort=True):
+        cell = {}
+        for metric, column in SKETCH_METRICS.items():
+            sketch = KLLSketch(k)
+            for value in group[column].to_numpy().tolist():
+                sketch.update(value)
+            cell[metric] = sketch.to_list()
+        days[date][str(int(hour))] = cell
+    return {'k': k, 'days': dict(days)}
+
+
+def merge_sketch_lists(compactor_lists, k=DEFAULT_K):
+    """Merge many sketches given as compactor lists into one KLLSketch, compressing once."""
+    levels = []
+    for compactors in compactor_lists:
+        while len(levels) < len(compactors):
+            levels.append([])
+        for level, compactor in enumerate(compactors):
+            levels[level].extend(compactor)
+    sketch = KLLSketch(k, levels or None)
+    sketch._compress()
+    return sketch
+
+
+def merge_daily_sketches(sketches, start_date=None, end_date=None):
+    """Merge the daily sketches of a date range into one sketch per (hour, day of week).
+
+    Each cell's daily compactors are concatenated level by level and compressed
+    once, rather than merged pairwise day by day.
+    Returns {metric: {(hour, day_name): KLLSketch}}.
+    """
+    k = sketches['k']
+    cells = {metric: defaultdict(list) for metric in SKETCH_METRICS}
+    for date, hours in sketches['days'].items():
+        if start_date and end_date and not (start_date <= date <= end_date):
+            continue
+        day_name = np.datetime64(date, 'D').astype(object).strftime('%A')
+        for hour, cell in hours.items():
+            key = (int(hour), day_name)
+            for metric, compactors in cell.items():
+                cells[metric][key].append(compactors)
+    return {metric: {key: merge_sketch_lists(lists, k) for key, lists in by_key.items()}
+            for metric, by_key in cells.items()}
@@ -0,0 +1,223 @@
+"""Background refresh of stored channels' video statistics.
+
+Shorts gain most of their views in the first days after publishing, so a
+dataset goes stale long before anyone re-runs /api/analyze. This scheduler
+re-fetches ``videos`` statistics in batches of 50 IDs (one quota unit each) and
+spends its hourly budget on the videos most likely to have moved:
+
+    priority = hours since last refresh * (1 / (1 + age in days) + recent growth)
+
+``recent growth`` is the relative view gain seen at the video's previous
+refresh, capped at 1. A week-old video that stopped changing therefore comes
+round far less often than one published this morning or one still climbing.
+Videos refreshed less than REFRESH_MIN_INTERVAL_MINUTES ago are skipped.
+
+One process runs the scheduler. Every gunicorn worker calls ``start`` and
+tries to take an exclusive lock on a file in REFRESH_DIR, and the lock holder
+is the leader. If the leader exits, another worker takes over on its next
+attempt. The quota log and per-video refresh state are files in REFRESH_DIR,
+so a new leader continues within the same budget.
+
+Set REFRESH_QUOTA_PER_HOUR to a positive number of ``videos`` calls to enable
+it. The default, 0, leaves the scheduler off.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import dataset_store
+
+REFRESH_DIR = os.getenv('REFRESH_DIR', os.path.join('data', 'refresh'))
+REFRESH_QUOTA_PER_HOUR = int(os.getenv('REFRESH_QUOTA_PER_HOUR', '0'))
+REFRESH_INTERVAL_SECONDS = float(os.getenv('REFRESH_INTERVAL_SECONDS', '300'))
+REFRESH_MIN_INTERVAL_MINUTES = float(os.getenv('REFRESH_MIN_INTERVAL_MINUTES', '30'))
+BATCH_SIZE = 50
+QUOTA_WINDOW_SECONDS = 3600
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json_atomic(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=REFRESH_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _state_path(channel_id):
+    return os.path.join(REFRESH_DIR, f'{channel_id}.json')
+
+
+def _quota_path():
+    return os.path.join(REFRESH_DIR, 'quota.json')
+
+
+def remaining_quota(now):
+    """Return how many ``videos`` calls the last hour's log still allows."""
+    calls = [t for t in _read_json(_quota_path(), []) if t > now - QUOTA_WINDOW_SECONDS]
+    return max(0, REFRESH_QUOTA_PER_HOUR - len(calls))
+
+
+def _spend_quota(now, calls):
+    log = [t for t in _read_json(_quota_path(), []) if t > now - QUOTA_WINDOW_SECONDS]
+    _write_json_atomic(_quota_path(), log + [now] * calls)
+
+
+def reset_channel(channel_id, fetched_at=None):
+    """Record that every video of a channel was just fetched (by /api/analyze), dropping its refresh state."""
+    os.makedirs(REFRESH_DIR, exist_ok=True)
+    _write_json_atomic(_state_path(channel_id), {
+        'fetched_at': time.time() if fetched_at is None else fetched_at,
+        'videos': {},
+    })
+
+
+def video_priorities(df, state, now):
+    """Return a channel's refresh priority per video as a Series indexed by video_id, highest first.
+
+    state is the channel's refresh state: 'fetched_at' (the last full fetch)
+    and 'videos', mapping video_id to {'refreshed_at', 'growth'} for videos the
+    scheduler refreshed since.
+    """
+    published = pd.to_datetime(df['published_at'], utc=True).astype('int64').to_numpy() / 1e9
+    video_ids = df['video_id'].astype(str).to_numpy()
+    videos = state['videos']
+    refreshed_at = np.array([videos.get(v, {}).get('refreshed_at', state['fetched_at']) for v in video_ids],
+                            dtype=float)
+    growth = np.array([videos.get(v, {}).get('growth', 0.0) for v in video_ids], dtype=float)
+    age_days = np.maximum(now - published, 0) / 86400
+    stale_hours = np.maximum(now - refreshed_at, 0) / 3600
+    priority = stale_hours * (1 / (1 + age_days) + np.minimum(growth, 1.0))
+    priority[stale_hours * 60 < REFRESH_MIN_INTERVAL_MINUTES] = 0
+    priorities = pd.Series(priority, index=video_ids)
+    return priorities[priorities > 0].sort_values(ascending=False, kind='stable')
+
+
+def plan_refresh(budget, now):
+    """Pick up to budget batches across all stored channels; returns [(channel_id, [video_ids])]."""
+    candidates = []
+    for channel_id in dataset_store.list_channels():
+        df = dataset_store.load_frame(channel_id)
+        version = dataset_store.read_version(channel_id)
+        if df is None or version is None or df.empty:
+            continue
+        # Datasets from before the scheduler existed count from when they were written
+        state = _read_json(_state_path(channel_id), {'fetched_at': version['written_at'], 'videos': {}})
+        priorities = video_priorities(df, state, now)
+        candidates.append(pd.DataFrame({'channel_id': channel_id, 'video_id': priorities.index,
+                                        'priority': priorities.to_numpy()}))
+    if not candidates:
+        return []
+    # Batches never mix channels: cut each channel's ranking into full batches of its
+    # most urgent videos, then spend the budget on the batches with the most priority
+    batches = []
+    for frame in candidates:
+        ids, priority = frame['video_id'].tolist(), frame['priority'].to_numpy()
+        for start in range(0, len(ids), BATCH_SIZE):
+            batches.append((float(priority[start:start + BATCH_SIZE].sum()), frame['channel_id'].iloc[0],
+                            ids[start:start + BATCH_SIZE]))
+    batches.sort(key=lambda batch: batch[0], reverse=True)
+    return [(channel_id, ids) for _, channel_id, ids in batches[:budget]]
+
+
+def _record_refresh(channel_id, requested, previous, details, now, fetched_at):
+    state = _read_json(_state_path(channel_id), {'fetched_at': fetched_at, 'videos': {}})
+    previous_views = previous.set_index('video_id')['view_count']
+    current_views = details.drop_duplicates('video_id', keep='last').set_index('video_id')['view_count']
+    # Videos the API no longer returns (deleted, private) are marked too, so they stop using budget
+    for video_id in requested:
+        before, after = previous_views.get(video_id), current_views.get(video_id)
+        growth = (after - before) / max(before, 1) if before is not None and after is not None else 0.0
+        state['videos'][video_id] = {'refreshed_at': now, 'growth': float(max(growth, 0.0))}
+    _write_json_atomic(_state_path(channel_id), state)
+
+
+def run_once(fetch, apply, now=None):
+    """Refresh one round of batches; returns the number of ``videos`` calls made.
+
+    fetch(video_ids) returns a details frame (video_id, view_count, like_count,
+    comment_count) and raises on API errors; apply(channel_id, details) stores it
+    and returns the rows of the previous dataset it replaced, or None if the
+    dataset changed underneath.
+    """
+    os.makedirs(REFRESH_DIR, exist_ok=True)
+    now = time.time() if now is None else now
+    budget = remaining_quota(now)
+    if budget == 0:
+        return 0
+    calls = 0
+    fetched = {}
+    for channel_id, video_ids in plan_refresh(budget, now):
+        # Logged before the call, so a failing call still counts against the budget
+        _spend_quota(now, 1)
+        calls += 1
+        try:
+            details = fetch(video_ids)
+        except Exception as e:
+            # Usually quota or credentials, which the rest of the round would hit too; the
+            # batch's videos are not marked refreshed, so they stay at the front of the queue
+            print(f"DEBUG: Refresh fetch for {channel_id} failed, ending the round: {str(e)}")
+            break
+        requested, parts = fetched.setdefault(channel_id, ([], []))
+        requested.extend(video_ids)
+        parts.append(details)
+    for channel_id, (requested, parts) in fetched.items():
+        details = pd.concat(parts, ignore_index=True)
+        version = dataset_store.read_version(channel_id)
+        previous = apply(channel_id, details)
+        if previous is not None:
+            _record_refresh(channel_id, requested, previous, details, now, version['written_at'])
+    if calls:
+        print(f"DEBUG: Refreshed {sum(len(requested) for requested, _ in fetched.values())} videos "
+              f"in {calls} calls across {len(fetched)} channels")
+    return calls
+
+
+def _loop(fetch, apply):
+    lock_file = None
+    while True:
+        if lock_file is None:
+            os.makedirs(REFRESH_DIR, exist_ok=True)
+            candidate = open(os.path.join(REFRESH_DIR, 'leader.lock'), 'w')
+            try:
+                fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                lock_file = candidate  # held until this process exits
+                print(f"DEBUG: Refresh scheduler leader is pid {os.getpid()}")
+            except BlockingIOError:
+                candidate.close()
+        if lock_file is not None:
+            try:
+                run_once(fetch, apply)
+            except Exception as e:
+                import traceback
+                print(f"DEBUG: Refresh round failed: {str(e)}")
+                print(f"DEBUG: Traceback: {traceback.format_exc()}")
+        time.sleep(REFRESH_INTERVAL_SECONDS)
+
+
+def start(fetch, apply):
+    """Start the scheduler thread in this process if refreshing is enabled (idempotent)."""
+    global _started
+    if REFRESH_QUOTA_PER_HOUR <= 0:
+        return False
+    with _start_lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_loop, args=(fetch, apply), name='refresh-scheduler', daemon=True).start()
+    return True
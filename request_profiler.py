@@ -0,0 +1,181 @@
+"""Opt-in sampling profiler for individual API requests.
+
+Profiling is off unless ``PROFILE_TOKEN`` is set in the environment, and then
+only runs for requests that carry the same token in an ``X-Profile-Token``
+header or a ``profile`` query parameter. Requests without it pay a single header
+lookup.
+
+A profiled request is sampled from a background thread that reads the request
+thread's stack every ``PROFILE_INTERVAL_MS`` milliseconds. The samples are saved
+in speedscope format (open the file at https://www.speedscope.app) under
+``PROFILE_DIR``, keyed by a capture ID (the request's ``X-Request-ID`` plus a
+random suffix). Only the newest ``PROFILE_MAX_FILES`` captures are kept.
+"""
+import functools
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import make_response, request
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join('data', 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_SUFFIX = '.speedscope.json'
+_REQUEST_ID = re.compile(r'^[\w-]{1,64}$')
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval until stopped."""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []
+        self.frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _frame_id(self, code, line):
+        key = (code.co_name, code.co_filename, line)
+        if key not in self.frame_index:
+            self.frame_index[key] = len(self.frames)
+            self.frames.append({'name': code.co_name, 'file': code.co_filename, 'line': line})
+        return self.frame_index[key]
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                # speedscope expects the root frame first
+                self.samples.append(stack[::-1])
+                self.weights.append(now - last)
+            last = now
+
+    def to_speedscope(self, name):
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.duration,
+                'samples': self.samples,
+                'weights': self.weights,
+            }],
+            'name': name,
+            'exporter': 'youtube-shorts-analytics request_profiler',
+        }
+
+
+def profiling_requested():
+    """Return True if profiling is enabled and the current request asked for it with the right token."""
+    if not PROFILE_TOKEN:
+        return False
+    return _token_matches(request.headers.get('X-Profile-Token') or request.args.get('profile'))
+
+
+def admin_authorized():
+    """Return True if the current request may list or download captures."""
+    return bool(PROFILE_TOKEN) and _token_matches(request.headers.get('X-Profile-Token'))
+
+
+def _token_matches(token):
+    # Constant-time, so response timing does not reveal how much of a guess was right
+    return token is not None and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def _enforce_retention():
+    captures = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(PROFILE_SUFFIX)),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in captures[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def save_profile(request_id, profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, request_id + PROFILE_SUFFIX)
+    with open(path, 'w') as f:
+        json.dump(profile, f)
+    _enforce_retention()
+    return path
+
+
+def list_profiles():
+    """Return metadata for the stored captures, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    captures = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(PROFILE_SUFFIX):
+            stat = entry.stat()
+            captures.append({
+                'request_id': entry.name[:-len(PROFILE_SUFFIX)],
+                'captured_at': stat.st_mtime,
+                'size_bytes': stat.st_size,
+            })
+    return sorted(captures, key=lambda capture: capture['captured_at'], reverse=True)
+
+
+def profile_path(request_id):
+    """Return the file path of a capture, or None if the ID is invalid or unknown."""
+    if not _REQUEST_ID.match(request_id):
+        return None
+    path = os.path.join(PROFILE_DIR, request_id + PROFILE_SUFFIX)
+    return path if os.path.exists(path) else None
+
+
+def profiled(view):
+    """Decorate a Flask view so requests carrying the profile token are sampled and saved."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested():
+            return view(*args, **kwargs)
+
+        # A client's X-Request-ID is kept as a prefix; the random suffix stops a
+        # repeated ID from overwriting an earlier capture
+        client_id = request.headers.get('X-Request-ID', '')
+        suffix = uuid.uuid4().hex
+        request_id = f'{client_id[:55]}-{suffix[:8]}' if _REQUEST_ID.match(client_id) else suffix
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            profiler.stop()
+            save_profile(request_id, profiler.to_speedscope(f'{request.method} {request.path}'))
+            print(f"DEBUG: Saved profile {request_id} ({len(profiler.samples)} samples, {profiler.duration:.2f}s)")
+        response.headers['X-Profile-Id'] = request_id
+        return response
+    return wrapper
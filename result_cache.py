@@ -0,0 +1,102 @@
+"""Content-addressed cache for the subscriber analysis stages of /api/analyze.
+
+Peak detection, attributions and the per-day summary depend only on the
+uploaded CSV, the processed shorts dataset and the algorithm parameters. The
+cache key is a sha256 over all three: the CSV's own sha256, the dataset's
+content digest and the parameters. An identical resubmission for an unchanged
+dataset therefore reads the stored results instead of recomputing them. Any
+change to any of the three inputs produces a different key, so nothing has to
+be invalidated.
+
+Entries are gzip-compressed JSON files in RESULT_CACHE_DIR. Once the directory
+grows past RESULT_CACHE_MAX_BYTES, the least recently used entries are deleted.
+A hit touches the file's mtime, so mtime order is recency order.
+
+The sections of lean /api/analyze responses, fetched later through
+/api/analysis/<analysis_id>, use the same functions with SECTION_CACHE_DIR and
+SECTION_CACHE_MAX_BYTES. They are stored as the JSON text that was sent, and
+their separate budget keeps large analyses from evicting the results above.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join('data', 'result_cache'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+SECTION_CACHE_DIR = os.getenv('SECTION_CACHE_DIR', os.path.join('data', 'section_cache'))
+SECTION_CACHE_MAX_BYTES = int(os.getenv('SECTION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+SUFFIX = '.json.gz'
+
+
+def cache_key(*parts):
+    """Return the hex sha256 of JSON-serializable key parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _entry_path(key, directory):
+    return os.path.join(directory, key + SUFFIX)
+
+
+def get_text(key, directory=None):
+    """Return the cached JSON text for a key, or None."""
+    path = _entry_path(key, directory or RESULT_CACHE_DIR)
+    try:
+        with gzip.open(path, 'rt') as f:
+            text = f.read()
+    except (OSError, EOFError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return text
+
+
+def get(key):
+    """Return the cached value for a key, or None."""
+    text = get_text(key)
+    try:
+        return json.loads(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+def put_text(key, text, directory=None, max_bytes=None):
+    """Store JSON text under a key, then evict down to the size limit."""
+    directory = directory or RESULT_CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt') as f:
+        f.write(text)
+    os.replace(tmp_path, _entry_path(key, directory))
+    evict(max_bytes, directory)
+
+
+def put(key, value):
+    """Store a JSON-serializable value under a key, then evict down to the size limit."""
+    put_text(key, json.dumps(value))
+
+
+def evict(max_bytes=None, directory=None):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    max_bytes = RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    with os.scandir(directory or RESULT_CACHE_DIR) as scan:
+        for entry in scan:
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
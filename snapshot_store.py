@@ -0,0 +1,236 @@
+"""Append-only store of per-video statistics snapshots.
+
+Every time a channel's video statistics are fetched, one row per video
+(video_id, fetched_at, views, likes, comments) is recorded. That gives a view
+count history, so we can tell how fast a Short gained views rather than only its
+current total.
+
+Each channel has its own directory with two kinds of file:
+
+``segment.bin``
+    The compacted history. It starts with a JSON index mapping each video ID to
+    the offset and length of its block. Each block holds one video's snapshots
+    as four int64 columns (fetched_at, views, likes, comments). Every column is
+    delta-encoded along time and the block is zlib-compressed. A query for one
+    video seeks to its block and decompresses only that block.
+
+``tail-<generation>.bin``
+    Fetches since the last compaction, appended as one uncompressed columnar
+    frame per fetch: the video IDs, then the int64 stats one column after the
+    other. A query looks up its video ID in each frame and takes that video's
+    column; nothing in the tail is compressed. Once the tail holds
+    COMPACT_AFTER_FRAMES frames, it is merged into a new segment and the
+    generation moves on, so a reader never scans more than a bounded number of
+    frames and never decompresses another video's data.
+
+Writers hold a per-channel file lock. The segment is replaced atomically and
+names the tail generation that belongs to it. A torn frame at the end of
+the tail is ignored by readers and cut off by the next writer. A query that
+races a compaction can miss the newest frames; they are already in the new
+segment for the next query.
+"""
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+COMPACT_AFTER_FRAMES = int(os.getenv('SNAPSHOT_COMPACT_AFTER', '16'))
+SEGMENT_FILE = 'segment.bin'
+STAT_COLUMNS = ['view_count', 'like_count', 'comment_count']
+_LENGTH = struct.Struct('<I')
+
+
+def _channel_dir(channel_id):
+    return os.path.join(SNAPSHOT_DIR, channel_id)
+
+
+def _tail_path(channel_id, generation):
+    return os.path.join(_channel_dir(channel_id), f'tail-{generation}.bin')
+
+
+@contextmanager
+def _write_lock(channel_id):
+    os.makedirs(_channel_dir(channel_id), exist_ok=True)
+    with open(os.path.join(_channel_dir(channel_id), 'write.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_segment_index(channel_id):
+    """Return (index, offset of the first block) of a channel's segment."""
+    try:
+        with open(os.path.join(_channel_dir(channel_id), SEGMENT_FILE), 'rb') as f:
+            (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+            return json.loads(f.read(length)), _LENGTH.size + length
+    except (OSError, struct.error, ValueError):
+        return {'generation': 0, 'videos': {}}, 0
+
+
+def _encode_block(columns):
+    """Delta-encode each int64 column along time and compress them together."""
+    encoded = np.diff(np.asarray(columns, dtype=np.int64), axis=1, prepend=0)
+    return zlib.compress(encoded.tobytes(), 6)
+
+
+def _decode_block(blob, count):
+    return np.cumsum(np.frombuffer(zlib.decompress(blob), dtype=np.int64).reshape(4, count), axis=1)
+
+
+def _encode_frame(fetched_at, video_ids, stats):
+    header = json.dumps({'fetched_at': fetched_at, 'count': len(video_ids)}).encode()
+    body = (_LENGTH.pack(len(header)) + header + '\n'.join(video_ids).encode()
+            + b'\0' + np.ascontiguousarray(stats, dtype=np.int64).tobytes())
+    return _LENGTH.pack(len(body)) + body
+
+
+def _decode_frame(payload):
+    """Return (fetched_at, video_ids, stats) of a tail frame; stats is a view over the payload."""
+    (length,) = _LENGTH.unpack_from(payload)
+    header = json.loads(payload[_LENGTH.size:_LENGTH.size + length])
+    count = header['count']
+    stats_offset = len(payload) - count * len(STAT_COLUMNS) * 8
+    ids = payload[_LENGTH.size + length:stats_offset - 1].decode()
+    stats = np.frombuffer(payload, dtype=np.int64, offset=stats_offset).reshape(len(STAT_COLUMNS), count)
+    return header['fetched_at'], ids.split('\n') if count else [], stats
+
+
+def _frame_spans(data):
+    """Return the (start, end) of each complete frame's payload in tail file bytes."""
+    spans = []
+    position = 0
+    while position + _LENGTH.size <= len(data):
+        (length,) = _LENGTH.unpack_from(data, position)
+        end = position + _LENGTH.size + length
+        if end > len(data):
+            break  # frame still being appended, or torn by a killed writer
+        spans.append((position + _LENGTH.size, end))
+        position = end
+    return spans
+
+
+def _tail_payloads(channel_id, generation):
+    """Yield the payload of each complete frame of a tail file."""
+    try:
+        with open(_tail_path(channel_id, generation), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return
+    for start, end in _frame_spans(data):
+        yield data[start:end]
+
+
+def _read_tail(channel_id, generation):
+    """Yield (fetched_at, video_ids, stats) for each complete frame of a tail file."""
+    for payload in _tail_payloads(channel_id, generation):
+        yield _decode_frame(payload)
+
+
+def _compact(channel_id, index, blocks_offset):
+    """Merge the tail into a new segment and start the next tail generation."""
+    generation = index['generation']
+    history = {}
+    for fetched_at, video_ids, stats in _read_tail(channel_id, generation):
+        for column, video_id in enumerate(video_ids):
+            history.setdefault(video_id, []).append([fetched_at, *stats[:, column]])
+
+    segment_path = os.path.join(_channel_dir(channel_id), SEGMENT_FILE)
+    blocks = {}
+    if index['videos']:
+        with open(segment_path, 'rb') as f:
+            for video_id, (offset, length, count) in index['videos'].items():
+                f.seek(blocks_offset + offset)
+                blocks[video_id] = (f.read(length), count)
+    for video_id, rows in history.items():
+        columns = np.array(rows, dtype=np.int64).T
+        if video_id in blocks:
+            blob, count = blocks[video_id]
+            columns = np.concatenate([_decode_block(blob, count), columns], axis=1)
+        blocks[video_id] = (_encode_block(columns), columns.shape[1])
+
+    new_index = {'generation': generation + 1, 'videos': {}}
+    offset = 0
+    for video_id, (blob, count) in blocks.items():
+        new_index['videos'][video_id] = [offset, len(blob), count]
+        offset += len(blob)
+    header = json.dumps(new_index).encode()
+    fd, tmp_path = tempfile.mkstemp(dir=_channel_dir(channel_id), suffix='.bin.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(_LENGTH.pack(len(header)) + header)
+        for blob, _ in blocks.values():
+            f.write(blob)
+    os.replace(tmp_path, segment_path)
+    os.remove(_tail_path(channel_id, generation))
+    print(f"DEBUG: Compacted snapshots for {channel_id}: {len(blocks)} videos, generation {generation + 1}")
+
+
+def record_snapshots(channel_id, details, fetched_at=None):
+    """Append one snapshot per row of a details frame (video_id plus STAT_COLUMNS)."""
+    if details.empty:
+        return
+    fetched_at = int(fetched_at if fetched_at is not None else time.time())
+    frame = _encode_frame(fetched_at, details['video_id'].astype(str).tolist(),
+                          details[STAT_COLUMNS].to_numpy(dtype=np.int64).T)
+    with _write_lock(channel_id):
+        index, blocks_offset = _read_segment_index(channel_id)
+        path = _tail_path(channel_id, index['generation'])
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+            spans = _frame_spans(f.read())
+            # Cut off a frame torn by a writer killed mid-append, or the new frame
+            # would be read as part of it
+            f.seek(spans[-1][1] if spans else 0)
+            f.truncate()
+            f.write(frame)
+        frames = len(spans) + 1
+        if frames >= COMPACT_AFTER_FRAMES:
+            _compact(channel_id, index, blocks_offset)
+
+
+def video_history(channel_id, video_id):
+    """Return a video's snapshots as a DataFrame of fetched_at (UTC) and STAT_COLUMNS, oldest first."""
+    index, blocks_offset = _read_segment_index(channel_id)
+    parts = []
+    entry = index['videos'].get(video_id)
+    if entry:
+        offset, length, count = entry
+        with open(os.path.join(_channel_dir(channel_id), SEGMENT_FILE), 'rb') as f:
+            f.seek(blocks_offset + offset)
+            parts.append(_decode_block(f.read(length), count))
+    for fetched_at, video_ids, stats in _read_tail(channel_id, index['generation']):
+        if video_id in video_ids:
+            column = video_ids.index(video_id)
+            parts.append(np.array([[fetched_at], *stats[:, column:column + 1]], dtype=np.int64))
+    columns = np.concatenate(parts, axis=1) if parts else np.empty((4, 0), dtype=np.int64)
+    history = pd.DataFrame(dict(zip(['fetched_at'] + STAT_COLUMNS, columns)))
+    history['fetched_at'] = pd.to_datetime(history['fetched_at'], unit='s', utc=True)
+    return history.sort_values('fetched_at', kind='stable').reset_index(drop=True)
+
+
+def view_velocity(history):
+    """Return views gained per hour between consecutive snapshots of a video_history frame."""
+    hours = history['fetched_at'].diff().dt.total_seconds() / 3600
+    velocity = history[['fetched_at']].assign(
+        views_gained=history['view_count'].diff(),
+        hours=hours,
+        views_per_hour=history['view_count'].diff() / hours.where(hours > 0),
+    )
+    return velocity.iloc[1:].reset_index(drop=True)
+
+
+def first_hours_curve(history, published_at, hours=48):
+    """Return the snapshots taken within ``hours`` of publishing, with hours_since_publish."""
+    published_at = pd.Timestamp(published_at)
+    if published_at.tzinfo is None:
+        published_at = published_at.tz_localize('UTC')
+    since = (history['fetched_at'] - published_at).dt.total_seconds() / 3600
+    return history.assign(hours_since_publish=since)[(since >= 0) & (since <= hours)].reset_index(drop=True)
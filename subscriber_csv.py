@@ -0,0 +1,174 @@
+"""Single-pass validating loader for uploaded subscriber CSVs.
+
+The upload is read once, in chunks. The date format is inferred from a sample of
+the first chunk and then applied to every chunk with that explicit format, so
+no value goes through pandas' per-element dateutil fallback. The metric column
+is coerced to numbers. Rows whose date or metric cannot be parsed are dropped
+and reported as structured errors instead of failing the whole upload.
+
+The same loader backs /api/analyze, generate_sub_peaks.py and
+check_csv_format.py.
+"""
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+SAMPLE_ROWS = 200
+MAX_REPORTED_ERRORS = 50
+# Tried in order; month-first comes before day-first, matching pandas' default
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%m/%d/%y',
+    '%m/%d/%Y',
+    '%d/%m/%y',
+    '%d/%m/%Y',
+    '%Y/%m/%d',
+    '%d.%m.%Y',
+    '%b %d, %Y',
+    '%d %b %Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%SZ',
+    '%m/%d/%Y %H:%M',
+]
+
+
+class SubscriberUpload:
+    """The result of loading a subscriber CSV.
+
+    ``series`` is the date-indexed metric series sorted by date, or None when the
+    upload is unusable. ``rows`` holds every row with its columns as uploaded,
+    for the raw sub_stats response. ``errors`` lists problems as
+    dicts with row (the 1-based line in the file, or None for the whole file),
+    column, value and message.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.date_column = None
+        self.metric_column = None
+        self.date_format = None
+        self.series = None
+        self.rows = None
+        self.total_rows = 0
+        self.dropped_rows = 0
+        self.errors = []
+
+    def add_error(self, message, row=None, column=None, value=None):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'column': column, 'value': value, 'message': message})
+
+    def summary(self):
+        return {
+            'date_column': self.date_column,
+            'metric_column': self.metric_column,
+            'date_format': self.date_format,
+            'rows': self.total_rows,
+            'dropped_rows': self.dropped_rows,
+            'errors': self.errors,
+        }
+
+
+def select_columns(columns):
+    """Return (date column, metric column): Date/Subscribers if present, else the first two columns."""
+    columns = list(columns)
+    date_column = 'Date' if 'Date' in columns else columns[0]
+    if 'Subscribers' in columns:
+        return date_column, 'Subscribers'
+    return date_column, next(column for column in columns if column != date_column)
+
+
+def infer_date_format(values):
+    """Return the DATE_FORMATS entry that parses the most sample values (earliest on ties), or None.
+
+    Scoring by count rather than requiring every value to parse keeps a stray
+    footer such as a "Total" row from disabling the explicit format.
+    """
+    sample = pd.Series(values, dtype=object).dropna().astype(str).str.strip()
+    sample = sample[sample != ''].head(SAMPLE_ROWS)
+    if sample.empty:
+        return None
+    best_format, best_count = None, 0
+    for date_format in DATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum())
+        if count > best_count:
+            best_format, best_count = date_format, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+def _parse_dates(values, date_format):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype(str).str.strip()
+    if date_format is not None:
+        return pd.to_datetime(text, format=date_format, errors='coerce')
+    return pd.to_datetime(text, format='mixed', errors='coerce')
+
+
+def _report_invalid(upload, chunk, mask, column, message):
+    for row, value in chunk.loc[mask, column].head(MAX_REPORTED_ERRORS).items():
+        upload.add_error(message, row=int(row) + 2, column=column, value=None if pd.isna(value) else str(value))
+
+
+def load_subscriber_csv(csv_source, chunksize=CHUNK_ROWS):
+    """Read a subscriber CSV (path or file-like object) once and validate it.
+
+    Always returns a SubscriberUpload. Problems with the file as a whole leave
+    ``series`` as None; rows with an unparseable date or metric are dropped.
+    """
+    upload = SubscriberUpload()
+    if hasattr(csv_source, 'seek'):
+        csv_source.seek(0)
+    try:
+        reader = pd.read_csv(csv_source, chunksize=chunksize)
+        first = next(reader, None)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        upload.add_error(f'Could not read CSV: {e}')
+        return upload
+    if first is None or len(first.columns) < 2:
+        found = 0 if first is None else len(first.columns)
+        upload.add_error(f'Need at least 2 columns (dates, then metric values), got {found}')
+        return upload
+
+    upload.columns = first.columns.tolist()
+    upload.date_column, upload.metric_column = select_columns(upload.columns)
+    upload.date_format = infer_date_format(first[upload.date_column].head(SAMPLE_ROWS))
+    if upload.date_format is None:
+        upload.add_error(f"Could not infer a date format for column '{upload.date_column}'; "
+                         "falling back to per-value parsing", column=upload.date_column)
+
+    dates, metrics, all_rows = [], [], []
+    chunk = first
+    try:
+        while chunk is not None:
+            upload.total_rows += len(chunk)
+            chunk_dates = _parse_dates(chunk[upload.date_column], upload.date_format)
+            chunk_metrics = pd.to_numeric(chunk[upload.metric_column], errors='coerce')
+            bad_dates = chunk_dates.isna()
+            bad_metrics = chunk_metrics.isna() & ~bad_dates
+            _report_invalid(upload, chunk, bad_dates, upload.date_column, 'Invalid or missing date')
+            _report_invalid(upload, chunk, bad_metrics, upload.metric_column, 'Invalid or missing metric value')
+            keep = ~(bad_dates | bad_metrics)
+            upload.dropped_rows += int((~keep).sum())
+            dates.append(chunk_dates[keep])
+            metrics.append(chunk_metrics[keep])
+            all_rows.append(chunk)
+            chunk = next(reader, None)
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        upload.add_error(f'Could not read CSV: {e}')
+        return upload
+
+    date_values = pd.concat(dates)
+    if date_values.empty:
+        upload.add_error(f"No rows with a valid date and metric value in columns "
+                         f"'{upload.date_column}' and '{upload.metric_column}'")
+        return upload
+    series = pd.Series(pd.concat(metrics).to_numpy(), index=pd.DatetimeIndex(date_values.to_numpy()),
+                       name=upload.metric_column)
+    series.index.name = upload.date_column
+    upload.series = series.sort_index(kind='stable')
+    upload.rows = pd.concat(all_rows)
+    print(f"DEBUG: Loaded subscriber CSV: {len(series)} of {upload.total_rows} rows valid, "
+          f"date format {upload.date_format}")
+    return upload
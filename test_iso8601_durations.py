@@ -0,0 +1,16 @@
+import math
+
+import pandas as pd
+
+from app import parse_iso8601_durations
+
+
+def test_parses_dates_times_and_fractional_seconds():
+    seconds = parse_iso8601_durations(pd.Series(['P0D', 'PT1H2M3.5S', 'P1DT2H', 'PT45S', 'P1W']))
+    assert seconds.tolist() == [0.0, 3723.5, 93600.0, 45.0, 604800.0]
+
+
+def test_malformed_duration_is_nan():
+    seconds = parse_iso8601_durations(pd.Series(['PT1M', '1:02', 'PT1H2X', '']))
+    assert seconds[0] == 60.0
+    assert all(math.isnan(value) for value in seconds[1:])
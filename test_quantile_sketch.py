@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import (DEFAULT_K, KLLSketch, build_daily_sketches, exact_quantile, merge_daily_sketches,
+                             merge_sketch_lists)
+
+
+def rank_error(values, estimate, q):
+    """Distance between q and the normalized rank range of estimate within values."""
+    values = np.sort(values)
+    low = np.searchsorted(values, estimate, side='left') / len(values)
+    high = np.searchsorted(values, estimate, side='right') / len(values)
+    return 0.0 if low <= q <= high else min(abs(q - low), abs(q - high))
+
+
+def sketch_of(values, k=DEFAULT_K):
+    sketch = KLLSketch(k)
+    for value in values:
+        sketch.update(value)
+    return sketch
+
+
+def test_small_sketch_is_exact():
+    values = np.random.default_rng(0).integers(0, 10_000, 150).tolist()
+    sketch = sketch_of(values)
+    assert sketch.count() == len(values)
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == exact_quantile(values, q)
+
+
+def test_rank_error_within_bound():
+    values = np.random.default_rng(1).lognormal(8, 2, 50_000).tolist()
+    sketch = sketch_of(values)
+    assert sketch.count() == len(values)
+    # Capacities shrink by 2/3 per level, so the sketch holds at most about 3k items
+    assert sketch.size() < 4 * DEFAULT_K
+    for q in (0.1, 0.5, 0.9, 0.99):
+        assert rank_error(values, sketch.quantile(q), q) < 2 / DEFAULT_K
+
+
+def test_merge_keeps_weight_and_accuracy():
+    rng = np.random.default_rng(2)
+    parts = [rng.lognormal(6, 1.5, int(n)).tolist() for n in rng.integers(1, 2_000, 40)]
+    merged = sketch_of(parts[0])
+    for part in parts[1:]:
+        merged.merge(sketch_of(part))
+    batched = merge_sketch_lists([sketch_of(part).to_list() for part in parts])
+    values = [value for part in parts for value in part]
+    for sketch in (merged, batched):
+        assert sketch.count() == len(values)
+        for q in (0.5, 0.9):
+            assert rank_error(values, sketch.quantile(q), q) < 2 / DEFAULT_K
+
+
+def test_merge_daily_sketches_by_hour_and_weekday():
+    rng = np.random.default_rng(3)
+    dates = pd.date_range('2024-01-01', periods=60, freq='D')
+    df = pd.DataFrame({
+        'date': np.repeat(dates.strftime('%Y-%m-%d'), 5),
+        'hour': np.tile([9, 9, 9, 18, 18], len(dates)),
+        'view_count': rng.integers(0, 100_000, 5 * len(dates)),
+        'like_count': rng.integers(0, 1_000, 5 * len(dates)),
+        'comment_count': rng.integers(0, 100, 5 * len(dates)),
+    })
+    merged = merge_daily_sketches(build_daily_sketches(df), '2024-01-08', '2024-02-04')
+
+    in_range = df[(df['date'] >= '2024-01-08') & (df['date'] <= '2024-02-04')]
+    weekday = pd.to_datetime(in_range['date']).dt.day_name()
+    expected = in_range.groupby([in_range['hour'], weekday])['view_count'].median()
+    assert set(merged['views']) == set(expected.index)
+    for key, sketch in merged['views'].items():
+        cell = in_range[(in_range['hour'] == key[0]) & (weekday == key[1])]['view_count']
+        assert sketch.count() == len(cell)
+        assert sketch.quantile(0.5) == exact_quantile(cell, 0.5)
@@ -0,0 +1,87 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot_store
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(snapshot_store, 'COMPACT_AFTER_FRAMES', 4)
+    return tmp_path
+
+
+def details(video_ids, views):
+    return pd.DataFrame({
+        'video_id': video_ids,
+        'view_count': views,
+        'like_count': [view // 10 for view in views],
+        'comment_count': [view // 100 for view in views],
+    })
+
+
+def record_fetches(fetches):
+    for fetched_at, frame in fetches:
+        snapshot_store.record_snapshots('chan', frame, fetched_at=fetched_at)
+
+
+def test_delta_block_round_trip():
+    columns = np.array([[100, 160, 400], [5, 2_000_000, 2_000_001], [0, 3, 1], [7, 7, 7]], dtype=np.int64)
+    blob = snapshot_store._encode_block(columns)
+    np.testing.assert_array_equal(snapshot_store._decode_block(blob, 3), columns)
+
+
+def test_history_spans_segment_and_tail():
+    fetches = [(1_000 + 3_600 * i, details(['a', 'b'], [10 * (i + 1), 5 * i])) for i in range(6)]
+    record_fetches(fetches)
+
+    index, _ = snapshot_store._read_segment_index('chan')
+    assert index['generation'] == 1
+    assert index['videos']['a'][2] == 4  # four fetches compacted, two still in the tail
+
+    history = snapshot_store.video_history('chan', 'a')
+    assert history['view_count'].tolist() == [10, 20, 30, 40, 50, 60]
+    assert history['like_count'].tolist() == [1, 2, 3, 4, 5, 6]
+    assert history['fetched_at'].iloc[-1] == pd.Timestamp(1_000 + 3_600 * 5, unit='s', tz='UTC')
+    velocity = snapshot_store.view_velocity(history)
+    assert velocity['views_per_hour'].tolist() == [10.0] * 5
+
+
+def test_compaction_merges_into_existing_blocks():
+    record_fetches([(i, details(['a'], [i])) for i in range(4)])
+    record_fetches([(10 + i, details(['a', 'c'], [10 + i, 1])) for i in range(4)])
+
+    index, _ = snapshot_store._read_segment_index('chan')
+    assert index['generation'] == 2
+    assert snapshot_store.video_history('chan', 'a')['view_count'].tolist() == [0, 1, 2, 3, 10, 11, 12, 13]
+    assert snapshot_store.video_history('chan', 'c')['view_count'].tolist() == [1, 1, 1, 1]
+    assert snapshot_store.video_history('chan', 'missing').empty
+
+
+def test_torn_tail_frame_is_ignored(snapshot_dir):
+    record_fetches([(1, details(['a'], [1])), (2, details(['a'], [2]))])
+    tail = snapshot_dir / 'chan' / 'tail-0.bin'
+    partial = snapshot_store._encode_frame(3, ['a'], np.array([[3], [0], [0]]))
+    with open(tail, 'ab') as f:
+        f.write(partial[:len(partial) // 2])
+
+    assert snapshot_store.video_history('chan', 'a')['view_count'].tolist() == [1, 2]
+
+    # The next writer drops the torn bytes, and the tail still compacts
+    record_fetches([(10 + i, details(['a'], [10 + i])) for i in range(10)])
+    assert snapshot_store.video_history('chan', 'a')['view_count'].tolist() == [1, 2] + list(range(10, 20))
+    index, _ = snapshot_store._read_segment_index('chan')
+    assert index['generation'] == 3
+
+
+def test_single_video_query_decompresses_one_block(monkeypatch):
+    record_fetches([(i, details([f'v{n}' for n in range(50)], list(range(i, i + 50)))) for i in range(6)])
+    calls = []
+    decompress = zlib.decompress
+    monkeypatch.setattr(snapshot_store.zlib, 'decompress', lambda data: calls.append(len(data)) or decompress(data))
+
+    assert snapshot_store.video_history('chan', 'v7')['view_count'].tolist() == [7, 8, 9, 10, 11, 12]
+    assert len(calls) == 1
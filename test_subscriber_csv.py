@@ -0,0 +1,47 @@
+import io
+
+from subscriber_csv import infer_date_format, load_subscriber_csv
+
+
+def csv_text(*lines):
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+def test_infers_day_first_and_month_first():
+    assert infer_date_format(['01/02/2024', '03/04/2024', '12/05/2024']) == '%m/%d/%Y'
+    assert infer_date_format(['01/02/2024', '13/04/2024', '25/05/2024']) == '%d/%m/%Y'
+
+    upload = load_subscriber_csv(csv_text('Date,Subscribers', '01/02/2024,5', '13/02/2024,7'))
+    assert upload.date_format == '%d/%m/%Y'
+    assert upload.series.index.strftime('%Y-%m-%d').tolist() == ['2024-02-01', '2024-02-13']
+
+
+def test_total_footer_row_is_dropped_and_reported():
+    upload = load_subscriber_csv(csv_text('Date,Subscribers', '2024-01-01,5', '2024-01-02,7', 'Total,12'))
+    assert upload.date_format == '%Y-%m-%d'
+    assert upload.series.tolist() == [5, 7]
+    assert upload.dropped_rows == 1
+    assert upload.errors == [{'row': 4, 'column': 'Date', 'value': 'Total', 'message': 'Invalid or missing date'}]
+
+
+def test_header_only_has_no_series():
+    upload = load_subscriber_csv(csv_text('Date,Subscribers'))
+    assert upload.series is None
+    assert upload.total_rows == 0
+    assert upload.errors[-1]['message'].startswith('No rows with a valid date and metric value')
+
+
+def test_non_utf8_upload_is_reported():
+    upload = load_subscriber_csv(io.BytesIO('Date,Subscribers\n2024-01-01,5\nd\xe9c,3\n'.encode('latin-1')))
+    assert upload.series is None
+    assert len(upload.errors) == 1
+    assert upload.errors[0]['row'] is None
+    assert upload.errors[0]['message'].startswith('Could not read CSV')
+
+
+def test_error_rows_are_file_lines_across_chunks():
+    upload = load_subscriber_csv(csv_text('Date,Subscribers', '2024-01-01,5', '2024-01-02,x', '2024-01-03,7',
+                                          'bad,1', '2024-01-05,9', 'Total,21'), chunksize=2)
+    assert upload.series.tolist() == [5, 7, 9]
+    assert upload.total_rows == 6
+    assert [(error['row'], error['value']) for error in upload.errors] == [(3, 'x'), (5, 'bad'), (7, 'Total')]
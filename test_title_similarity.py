@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from title_similarity import BANDS, NUM_PERM, ROWS_PER_BAND, assign_title_clusters, cluster_signatures
+
+
+def with_bands_changed(signature, bands, offset):
+    changed = signature.copy()
+    for band in bands:
+        changed[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND] += offset
+    return changed
+
+
+def test_similarity_is_not_transitive():
+    a = np.arange(NUM_PERM, dtype=np.uint32)
+    b = with_bands_changed(a, range(0, 4), 1000)             # 75% equal to a
+    c = with_bands_changed(b, range(BANDS - 4, BANDS), 2000)  # 75% equal to b, 50% to a
+    assert cluster_signatures(np.stack([a, b, c])).tolist() == [0, 0, 2]
+
+
+def test_rows_join_earliest_matching_leader():
+    a = np.arange(NUM_PERM, dtype=np.uint32)
+    other = a + 5000
+    signatures = np.stack([other, a, a.copy(), with_bands_changed(a, [0], 1), other.copy()])
+    assert cluster_signatures(signatures).tolist() == [0, 1, 1, 1, 0]
+
+
+def test_assign_title_clusters():
+    df = pd.DataFrame({
+        'video_id': ['v1', 'v2', 'v3', 'v4'],
+        'clean_title': ['my cat tries the new cat tower', 'My cat tries the new cat tower!',
+                        'dog learns to skateboard', ''],
+    })
+    assert assign_title_clusters(df) == ['v1', 'v1', 'v3', 'v4']
@@ -0,0 +1,135 @@
+"""Near-duplicate title detection with MinHash and locality-sensitive hashing.
+
+Every clean_title is reduced to a MinHash signature over its character
+shingles. Signatures are split into bands, and only titles that share a band
+bucket are compared, so grouping re-uploads and lightly retitled Shorts costs
+roughly O(n) instead of O(n^2) pairwise comparisons. With 16 bands of 8 rows, titles
+with a Jaccard similarity around 0.7 or higher are very likely to become
+candidates; candidates are then confirmed against SIMILARITY_THRESHOLD, and each
+title joins the earliest matching cluster leader.
+
+Signatures are persisted per channel, keyed by video ID and a digest of the
+title, so a re-analysis only hashes videos that are new or were retitled.
+"""
+import os
+import re
+import tempfile
+import zlib
+
+import numpy as np
+
+SIGNATURE_DIR = os.getenv('TITLE_SIGNATURE_DIR', os.path.join('data', 'title_signatures'))
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+# Fixed seed: persisted signatures must stay comparable across runs and processes
+_perm_rng = np.random.RandomState(20240601)
+_PERM_A = _perm_rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64)
+_PERM_B = _perm_rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+# Real signature values are below _PRIME, so this marks titles with no shingles
+EMPTY_SIGNATURE = np.uint32(0xFFFFFFFF)
+
+
+def shingles(title):
+    text = re.sub(r'\s+', ' ', str(title).lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title):
+    """Return the MinHash signature of a title as a uint32 array of NUM_PERM values."""
+    title_shingles = shingles(title)
+    if not title_shingles:
+        return np.full(NUM_PERM, EMPTY_SIGNATURE, dtype=np.uint32)
+    # crc32 rather than hash(): Python's string hash is salted per process
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in title_shingles), dtype=np.uint64)
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _title_digest(title):
+    return zlib.crc32(str(title).encode('utf-8'))
+
+
+def _signature_path(channel_id):
+    return os.path.join(SIGNATURE_DIR, f'{channel_id}.npz')
+
+
+def _load_signatures(channel_id):
+    try:
+        with np.load(_signature_path(channel_id)) as stored:
+            return {
+                video_id: (int(digest), signature)
+                for video_id, digest, signature in zip(stored['video_ids'], stored['digests'], stored['signatures'])
+            }
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def _save_signatures(channel_id, video_ids, digests, signatures):
+    os.makedirs(SIGNATURE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=SIGNATURE_DIR, suffix='.npz')
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, video_ids=np.asarray(video_ids, dtype=str), digests=np.asarray(digests, dtype=np.int64),
+                 signatures=signatures)
+    os.replace(tmp_path, _signature_path(channel_id))
+
+
+def compute_signatures(video_ids, titles, channel_id=None):
+    """Return an (n, NUM_PERM) signature matrix, reusing and updating the channel's stored signatures."""
+    stored = _load_signatures(channel_id) if channel_id else {}
+    signatures = np.empty((len(titles), NUM_PERM), dtype=np.uint32)
+    digests = []
+    hashed = 0
+    for row, (video_id, title) in enumerate(zip(video_ids, titles)):
+        digest = _title_digest(title)
+        cached = stored.get(video_id)
+        if cached is not None and cached[0] == digest:
+            signatures[row] = cached[1]
+        else:
+            signatures[row] = minhash(title)
+            hashed += 1
+        digests.append(digest)
+    if channel_id:
+        _save_signatures(channel_id, list(video_ids), digests, signatures)
+    print(f"DEBUG: MinHash signatures: {hashed} hashed, {len(titles) - hashed} reused")
+    return signatures
+
+
+def cluster_signatures(signatures):
+    """Group rows whose signatures are similar; return the representative row of each row.
+
+    Leader clustering: in row order, a row joins the earliest leader it matches
+    at SIMILARITY_THRESHOLD, or becomes a leader itself. Every member is
+    therefore similar to its representative, and chains of pairwise matches
+    (A~B, B~C) do not pull dissimilar titles (A, C) into one cluster. Only
+    leaders are put in the band buckets, so rows are compared with candidate
+    leaders rather than with every other row.
+    """
+    representatives = np.arange(len(signatures), dtype=np.int64)
+    buckets = [{} for _ in range(BANDS)]
+    for row in np.flatnonzero(signatures[:, 0] != EMPTY_SIGNATURE):
+        keys = [signatures[row, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes() for band in range(BANDS)]
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(buckets[band].get(key, ()))
+        for leader in sorted(candidates):
+            if np.mean(signatures[row] == signatures[leader]) >= SIMILARITY_THRESHOLD:
+                representatives[row] = leader
+                break
+        else:
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(row)
+    return representatives
+
+
+def assign_title_clusters(df, channel_id=None):
+    """Label each row with the video_id of the first row (in frame order) of its near-duplicate cluster."""
+    video_ids = df['video_id'].tolist()
+    signatures = compute_signatures(video_ids, df['clean_title'].tolist(), channel_id)
+    representatives = cluster_signatures(signatures)
+    return [video_ids[rep] for rep in representatives]